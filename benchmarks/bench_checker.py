@@ -0,0 +1,93 @@
+"""
+End-to-end benchmark: run check_links() offline against the local fixture web farm.
+
+The sheet, Slack webhook and DNS are all local, so runs are repeatable and touch nothing real.
+Usage: python benchmarks/bench_checker.py [--urls 200] [--runs 2] [--pool-size 2] [--workers 4]
+With --workers the checker runs as a coordinator with that many local worker processes;
+the workers resolve hosts with the system resolver (.invalid names are NXDOMAIN there too).
+"""
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+from collections import Counter
+
+from common import load_linkchecker
+from fixtures import FakeSheetsClient, FixtureFarm, stub_resolve
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--urls', type=int, default=200, help='Sheet rows to generate')
+    parser.add_argument('--runs', type=int, default=2, help='Consecutive runs (later runs exercise revalidation)')
+    parser.add_argument('--hosts', type=int, default=8, help='Loopback fixture servers')
+    parser.add_argument('--slow-delay', type=float, default=2.0, help='Seconds the slow fixture waits')
+    parser.add_argument('--concurrency', type=int, help='MAX_CONCURRENT_REQUESTS')
+    parser.add_argument('--per-host', type=int, help='MAX_REQUESTS_PER_HOST')
+    parser.add_argument('--pool-size', type=int, help='SELENIUM_POOL_SIZE')
+    parser.add_argument('--max-pages', type=int, help='DRIVER_MAX_PAGES')
+    parser.add_argument('--workers', type=int, help='Run as a coordinator with this many WORKER_PROCESSES')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='linkchecker-bench-')
+    # Settings are read when the script is imported, so they go into the environment first
+    os.environ['RESULT_STORE_PATH'] = os.path.join(workdir, 'results.db')
+    os.environ['SPAN_LOG_PATH'] = os.path.join(workdir, 'spans.jsonl')
+    os.environ['METRICS_PATH'] = os.path.join(workdir, 'metrics.prom')
+    os.environ['WORK_QUEUE_PATH'] = os.path.join(workdir, 'queue.db')
+    if args.workers is not None:
+        os.environ['RUN_MODE'] = 'coordinator'
+        os.environ['WORKER_PROCESSES'] = str(args.workers)
+    for name, value in [('MAX_CONCURRENT_REQUESTS', args.concurrency),
+                        ('MAX_REQUESTS_PER_HOST', args.per_host),
+                        ('SELENIUM_POOL_SIZE', args.pool_size),
+                        ('DRIVER_MAX_PAGES', args.max_pages)]:
+        if value is not None:
+            os.environ[name] = str(value)
+
+    farm = FixtureFarm(hosts=args.hosts, slow_delay=args.slow_delay)
+    try:
+        lc = load_linkchecker()
+        rows = farm.sheet_rows(args.urls)
+        lc.get_sheets_client = lambda: FakeSheetsClient(rows)
+        lc.SLACK_WEBHOOK_URL = farm.slack_url
+        lc.HOST_RESOLVER = lc.HostResolver(resolve_fn=stub_resolve)
+
+        results = []
+        for run in range(args.runs):
+            summary = asyncio.run(lc.check_links())
+            if summary is None:
+                raise SystemExit(f"Run {run + 1} failed; see the output above")
+            results.append(summary)
+
+        print(f"\n{'=' * 72}")
+        mode = f", {args.workers} worker processes" if args.workers is not None else ""
+        print(f"Benchmark: {args.urls} rows across {args.hosts} fixture hosts, slow delay {args.slow_delay}s{mode}")
+        print(f"{'run':>4} {'URLs/sec':>10} {'wall':>8} {'p50':>8} {'p95':>8} {'chrome loads':>13} {'peak MB':>8} {'steady MB':>10}  verdicts")
+        for run, summary in enumerate(results, 1):
+            latencies = list(summary['latencies'].values())
+            verdicts = Counter(verdict for verdict, _ in summary['verdicts'].values())
+            print(f"{run:>4} {summary['rows'] / summary['wall_time']:>10.1f} {summary['wall_time']:>7.1f}s "
+                  f"{percentile(latencies, 50):>7.2f}s {percentile(latencies, 95):>7.2f}s "
+                  f"{summary['renders']:>13} {summary['memory']['peak_mb']:>8.0f} "
+                  f"{summary['memory']['steady_mb']:>10.0f}  {dict(verdicts)}")
+        print(f"Peak RSS: {peak_rss_mb(resource.RUSAGE_SELF):.1f}MB checker, "
+              f"{peak_rss_mb(resource.RUSAGE_CHILDREN):.1f}MB largest exited child (Chrome/chromedriver)")
+        print(f"Slack messages received by the stub webhook: {len(farm.slack.messages)}")
+        print(f"Stage spans and metrics: {workdir}")
+    finally:
+        farm.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark: PAGE_MATCHER keyword-gated scan vs the per-pattern substring checks it replaced.
+The stream column feeds the same page through a StreamScanner in STREAM_CHUNK_SIZE chunks.
+
+Usage: python benchmarks/bench_matcher.py [--sizes 1,5,10] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+from common import load_linkchecker
+
+CORPORA = {
+    # Ordinary landing-page markup and copy
+    'prose': [
+        '<div class="content">', '</div>', '<p>', '</p>', '<a href="/about">', '</a>', '<li>', '</li>',
+        'the', 'best', 'offers', 'for', 'your', 'home', 'and', 'garden', 'shop', 'now', 'free',
+        'shipping', 'on', 'all', 'orders', 'over', 'learn', 'more', 'about', 'our', 'products',
+    ],
+    # Words that start indicator patterns, so the matcher has to look at many candidates
+    'adversarial': [
+        '<div class="content">', '</div>', '<p>', '</p>', '<span style="font-size:12px">', '</span>',
+        'the', 'domain', 'of', 'this', 'site', 'page', 'with', 'text', 'renew', 'dns', 'ray',
+        'expiration', 'error', 'cloud', 'registration', 'has', 'is', 'name', 'a', 'for',
+    ],
+}
+
+def make_html(size_mb, corpus, seed=0):
+    filler_words = CORPORA[corpus]
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    words = []
+    length = 0
+    while length < target:
+        word = rng.choice(filler_words)
+        words.append(word)
+        length += len(word) + 1
+    # One real indicator near the end so both implementations have to read the whole page
+    words.insert(len(words) - 10, 'ray id: 12345 cloudflare')
+    return ' '.join(words)
+
+def legacy_checks(html, span_texts, lc):
+    """The substring checks check_links() and analyze_domain_status() ran before PAGE_MATCHER."""
+    found = []
+    response_text_lower = html.lower()
+    for pattern in ["error 1000", "dns points to prohibited ip", "cloudflare", "dns_probe_finished_nxdomain"]:
+        if pattern in response_text_lower:
+            found.append(pattern)
+    
+    page_source = html.lower()
+    for pattern in ["error 1000", "ray id:", "cloudflare", "dns points to", "dns_probe_finished_nxdomain", "this site can't be reached"]:
+        if pattern in page_source:
+            found.append(pattern)
+    
+    expiration_patterns = lc.get_domain_expiration_indicators()['message_patterns']
+    page_text = html.lower()
+    for pattern in expiration_patterns:
+        if pattern in page_text:
+            found.append(pattern)
+    
+    for text in span_texts:
+        text = text.strip().lower()
+        for pattern in expiration_patterns:
+            if pattern in text:
+                found.append(pattern)
+    return found
+
+def matcher_checks(html, span_texts, lc):
+    hits = lc.PAGE_MATCHER.scan(html)
+    lc.PAGE_MATCHER.scan('\n'.join(span_texts))
+    return hits
+
+def stream_checks(html, lc):
+    scanner = lc.StreamScanner(lc.PAGE_MATCHER)
+    for start in range(0, len(html), lc.STREAM_CHUNK_SIZE):
+        scanner.feed(html[start:start + lc.STREAM_CHUNK_SIZE])
+    return scanner.hits
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1,5,10', help='Comma-separated HTML body sizes in MB')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--corpus', choices=sorted(CORPORA), action='append',
+                        help='Filler text to generate (default: all corpora)')
+    args = parser.parse_args()
+    
+    lc = load_linkchecker()
+    span_texts = [f'Span {i} with some ordinary text' for i in range(500)]
+    
+    print(f"{'corpus':<12} {'size':>8} {'legacy':>12} {'matcher':>12} {'speedup':>8} {'stream':>12} {'speedup':>8}")
+    for corpus in args.corpus or sorted(CORPORA):
+        for size in [float(s) for s in args.sizes.split(',')]:
+            html = make_html(size, corpus)
+            legacy = best_of(lambda: legacy_checks(html, span_texts, lc), args.repeat)
+            matcher = best_of(lambda: matcher_checks(html, span_texts, lc), args.repeat)
+            stream = best_of(lambda: stream_checks(html, lc), args.repeat)
+            print(f"{corpus:<12} {size:>6.1f}MB {legacy * 1000:>10.1f}ms {matcher * 1000:>10.1f}ms {legacy / matcher:>7.2f}x "
+                  f"{stream * 1000:>10.1f}ms {legacy / stream:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
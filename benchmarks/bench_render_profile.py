@@ -0,0 +1,73 @@
+"""
+Benchmark: per-page render time and Chrome memory for the 'full' and 'lean' render profiles.
+
+Renders fixture pages (an asset-heavy landing page, a registrar-expired plFrame page and a
+plain healthy page) with capture_page_snapshot() and checks that the lean profile still
+detects the expired pages. Needs Chrome and chromedriver, as in the Docker image.
+Usage: python benchmarks/bench_render_profile.py [--pages 30]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from common import load_linkchecker
+from fixtures import FixtureFarm
+
+KINDS = ['heavy', 'expired', 'healthy']
+
+def run_profile(lc, farm, profile, pages):
+    driver = lc.setup_selenium(profile)
+    timings = []
+    memory = []
+    expired_found = 0
+    expired_total = 0
+    try:
+        for i in range(pages):
+            kind = KINDS[i % len(KINDS)]
+            url = farm.url(i, kind)
+            start = time.perf_counter()
+            snapshot = lc.capture_page_snapshot(driver, url)
+            timings.append(time.perf_counter() - start)
+            memory.append(lc.driver_rss(driver))
+            if kind == 'expired':
+                expired_total += 1
+                is_expired, _ = lc.analyze_domain_status('', url, url, None, snapshot)
+                expired_found += bool(is_expired)
+    finally:
+        driver.quit()
+    return {
+        'mean': statistics.mean(timings),
+        'median': statistics.median(timings),
+        'peak_mb': max(memory) / 1024 / 1024,
+        'final_mb': memory[-1] / 1024 / 1024,
+        'expired': f'{expired_found}/{expired_total}',
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=30, help='Pages to render per profile')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='linkchecker-bench-')
+    os.environ['SPAN_LOG_PATH'] = os.path.join(workdir, 'spans.jsonl')
+    os.environ['METRICS_PATH'] = ''
+
+    farm = FixtureFarm(hosts=4)
+    try:
+        lc = load_linkchecker()
+        results = {profile: run_profile(lc, farm, profile, args.pages) for profile in ['full', 'lean']}
+    finally:
+        farm.close()
+
+    print(f"\n{'profile':<8} {'mean/page':>10} {'median':>8} {'peak Chrome RSS':>16} {'final RSS':>10} {'expired found':>14}")
+    for profile, r in results.items():
+        print(f"{profile:<8} {r['mean']:>9.2f}s {r['median']:>7.2f}s {r['peak_mb']:>14.0f}MB "
+              f"{r['final_mb']:>8.0f}MB {r['expired']:>14}")
+    full, lean = results['full'], results['lean']
+    print(f"\nLean vs full: {(1 - lean['mean'] / full['mean']) * 100:.0f}% less time per page, "
+          f"{(1 - lean['peak_mb'] / full['peak_mb']) * 100:.0f}% lower peak Chrome memory")
+
+if __name__ == '__main__':
+    main()
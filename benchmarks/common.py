@@ -0,0 +1,12 @@
+import importlib.util
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(REPO_ROOT, 'linkchecker PUBLIC.py')
+
+def load_linkchecker():
+    """Import the link checker script as a module (its file name isn't importable directly)."""
+    spec = importlib.util.spec_from_file_location('linkchecker', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
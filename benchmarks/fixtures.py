@@ -0,0 +1,209 @@
+"""
+A local fixture web farm and fake Google Sheet / Slack for running the checker offline.
+
+Each fixture server binds its own loopback address (127.0.0.1, 127.0.0.2, ...) so the
+checker's per-host limits behave as they would against many real domains.
+"""
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HEALTHY_PAGE = (
+    '<html><head><title>Garden Supplies</title></head><body>'
+    '<h1>Garden Supplies</h1>'
+    + '<p>Everything you need for your home and garden, with free shipping on orders over $50.</p>' * 10
+    + '</body></html>'
+)
+
+CLOUDFLARE_1000_PAGE = (
+    '<html><head><title>DNS points to prohibited IP | Cloudflare</title></head><body>'
+    '<h1>Error 1000</h1><h2>DNS points to prohibited IP</h2>'
+    '<p>Cloudflare Ray ID: 7d1f2a3b4c5d6e7f</p></body></html>'
+)
+
+# Registrar parking template: the expiration message only appears inside the plFrame iframe
+EXPIRED_PAGE = (
+    '<html><head><title>{host}</title></head><body>'
+    '<div id="target" style="opacity:0"><iframe id="plFrame" src="/parking-frame"></iframe></div>'
+    '<script>document.getElementById("target").style.opacity = 1;</script>'
+    '</body></html>'
+)
+
+PARKING_FRAME = (
+    '<html><body><span style="font-family:Arial">The domain has expired. Is this your domain?</span>'
+    '<a href="#">Renew now</a></body></html>'
+)
+
+# A landing page that pulls in the images, fonts, media and stylesheets a lean render can skip
+HEAVY_PAGE = (
+    '<html><head><title>Spring Sale</title><link rel="stylesheet" href="/asset/{id}/style.css"></head><body>'
+    '<h1>Spring Sale</h1>'
+    + ''.join(f'<img src="/asset/{{id}}/photo-{i}.jpg" width="400" height="300">' for i in range(20))
+    + '<video src="/asset/{id}/promo.mp4" autoplay muted></video>'
+    + '<p>Everything you need for your home and garden, with free shipping on orders over $50.</p>' * 10
+    + '</body></html>'
+)
+
+ASSET_SIZES = {'.jpg': 200 * 1024, '.css': 50 * 1024, '.mp4': 2 * 1024 * 1024, '.woff2': 100 * 1024}
+
+# Fixture kind -> share of the generated sheet rows
+DEFAULT_MIX = {
+    'healthy': 0.45,
+    'slow': 0.10,
+    'redirect': 0.10,
+    'cloudflare_1000': 0.05,
+    'expired': 0.10,
+    'forbidden': 0.05,
+    'server_error': 0.05,
+    'unresolvable': 0.10,
+}
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    slow_delay = 2.0
+    asset_delay = 0.05
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_page(self, status, body, headers=None):
+        payload = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        kind = parts[0]
+        if kind == 'healthy':
+            if self.headers.get('If-None-Match') == '"healthy-v1"':
+                self.send_response(304)
+                self.send_header('ETag', '"healthy-v1"')
+                self.end_headers()
+            else:
+                self.send_page(200, HEALTHY_PAGE, {'ETag': '"healthy-v1"'})
+        elif kind == 'slow':
+            time.sleep(self.slow_delay)
+            self.send_page(200, HEALTHY_PAGE)
+        elif kind == 'redirect':
+            # /redirect/<id>/<hops left>
+            hops = int(parts[2]) if len(parts) > 2 else 3
+            location = f'/redirect/{parts[1]}/{hops - 1}' if hops > 1 else f'/healthy/{parts[1]}'
+            self.send_response(302)
+            self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif kind == 'cloudflare_1000':
+            self.send_page(200, CLOUDFLARE_1000_PAGE)
+        elif kind == 'expired':
+            self.send_page(200, EXPIRED_PAGE.format(host=self.headers.get('Host', '')))
+        elif kind == 'parking-frame':
+            self.send_page(200, PARKING_FRAME)
+        elif kind == 'heavy':
+            self.send_page(200, HEAVY_PAGE.format(id=parts[1] if len(parts) > 1 else 0))
+        elif kind == 'asset':
+            time.sleep(self.asset_delay)
+            extension = '.' + self.path.rsplit('.', 1)[-1]
+            if extension == '.css':
+                payload = b'@font-face { font-family: Brand; src: url(brand.woff2); } body { font-family: Brand; }'
+                payload += b' ' * (ASSET_SIZES['.css'] - len(payload))
+            else:
+                payload = b'\0' * ASSET_SIZES.get(extension, 10 * 1024)
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        elif kind == 'forbidden':
+            self.send_page(403, '<html><body>Forbidden</body></html>')
+        elif kind == 'server_error':
+            self.send_page(503, '<html><body>Service Unavailable</body></html>')
+        else:
+            self.send_page(404, '<html><body>Not Found</body></html>')
+
+class SlackHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.messages.append(json.loads(self.rfile.read(length) or b'{}'))
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+def start_server(handler, address):
+    server = ThreadingHTTPServer((address, 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class FixtureFarm:
+    """Fixture HTTP servers on several loopback addresses plus a stub Slack webhook."""
+    def __init__(self, hosts=8, slow_delay=2.0):
+        handler = type('Handler', (FixtureHandler,), {'slow_delay': slow_delay})
+        self.servers = [start_server(handler, f'127.0.0.{i + 1}') for i in range(hosts)]
+        self.slack = start_server(SlackHandler, '127.0.0.1')
+        self.slack.messages = []
+
+    @property
+    def slack_url(self):
+        return f'http://127.0.0.1:{self.slack.server_port}/webhook'
+
+    def url(self, index, kind):
+        if kind == 'unresolvable':
+            return f'http://unresolvable-{index}.invalid/'
+        server = self.servers[index % len(self.servers)]
+        host, port = server.server_address
+        return f'http://{host}:{port}/{kind}/{index}'
+
+    def sheet_rows(self, count, mix=None):
+        """Build sheet rows (header first) whose URLs cover the fixture kinds in proportion to mix."""
+        mix = mix or DEFAULT_MIX
+        kinds = []
+        for kind, share in mix.items():
+            kinds.extend([kind] * round(count * share))
+        kinds = (kinds + ['healthy'] * count)[:count]
+        rows = [['Ad Account Name', 'Notes', 'Domain']]
+        rows.extend([f'Account {i}', '', self.url(i, kind)] for i, kind in enumerate(kinds))
+        return rows
+
+    def close(self):
+        for server in self.servers + [self.slack]:
+            server.shutdown()
+            server.server_close()
+
+async def stub_resolve(host):
+    """Stub resolver: loopback addresses resolve, *.invalid hosts are NXDOMAIN."""
+    if host.endswith('.invalid'):
+        raise socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+    return [host]
+
+class FakeWorksheet:
+    def __init__(self, rows):
+        self.id = 0
+        self.rows = rows
+
+    def get_all_values(self):
+        return self.rows
+
+class FakeSpreadsheet:
+    def __init__(self, rows):
+        self.worksheet = FakeWorksheet(rows)
+
+    def worksheets(self):
+        return [self.worksheet]
+
+class FakeSheetsClient:
+    """Stands in for the gspread client returned by get_sheets_client()."""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def open_by_key(self, key):
+        return FakeSpreadsheet(self.rows)
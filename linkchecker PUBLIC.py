@@ -1,6 +1,9 @@
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import time
 import asyncio
 import json
@@ -9,6 +12,23 @@ import pytz  # Add this import for timezone handling
 import os
 from dotenv import load_dotenv
 import re
+import codecs
+from http.cookiejar import DefaultCookiePolicy
+import signal
+import statistics
+import subprocess
+import sys
+import hashlib
+import heapq
+import queue
+import random
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from urllib.parse import urlparse
 from bs4 import BeautifulSoup  # Add BeautifulSoup for better HTML parsing
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -23,26 +43,34 @@ load_dotenv()
 scope = ['https://spreadsheets.google.com/feeds',
          'https://www.googleapis.com/auth/drive']
 
-# Modify the credentials setup
-if os.getenv('GOOGLE_CREDENTIALS'):
-    # Use credentials from environment variable
-    import json
-    credentials_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-else:
-    # Use local file for development
-    credentials = ServiceAccountCredentials.from_json_keyfile_name('sheetscredentials.json', scope)
-
-creds = gspread.authorize(credentials)
-
-# After loading credentials
-print("Service Account Email:", credentials._service_account_email)
-try:
-    # Try to list all spreadsheets to verify credentials
-    all_sheets = creds.openall()
-    print(f"Successfully authenticated. Can access {len(all_sheets)} sheets.")
-except Exception as e:
-    print(f"Authentication error: {str(e)}")
+creds = None
+
+def get_sheets_client():
+    """Authorize against Google Sheets on first use so the module can be imported offline."""
+    global creds
+    if creds is not None:
+        return creds
+    
+    # Modify the credentials setup
+    if os.getenv('GOOGLE_CREDENTIALS'):
+        # Use credentials from environment variable
+        credentials_dict = json.loads(os.getenv('GOOGLE_CREDENTIALS'))
+        credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
+    else:
+        # Use local file for development
+        credentials = ServiceAccountCredentials.from_json_keyfile_name('sheetscredentials.json', scope)
+    
+    creds = gspread.authorize(credentials)
+    
+    # After loading credentials
+    print("Service Account Email:", credentials._service_account_email)
+    try:
+        # Try to list all spreadsheets to verify credentials
+        all_sheets = creds.openall()
+        print(f"Successfully authenticated. Can access {len(all_sheets)} sheets.")
+    except Exception as e:
+        print(f"Authentication error: {str(e)}")
+    return creds
 
 # Set up Slack webhook - get from environment variable
 SLACK_WEBHOOK_URL = os.getenv('SLACK_WEBHOOK_URL')
@@ -50,10 +78,210 @@ SHEET_URL = os.getenv('SHEET_URL', '14Yk8UnQviC29ascf4frQfAEDWzM2_bp1UloRcnW8ZCg
 COLUMN_TO_CHECK = 'C'
 CHECK_INTERVAL = 180  # 3 minutes in seconds
 
+# HTTP probing settings
+MAX_CONCURRENT_REQUESTS = int(os.getenv('MAX_CONCURRENT_REQUESTS', '20'))
+MAX_REQUESTS_PER_HOST = int(os.getenv('MAX_REQUESTS_PER_HOST', '2'))
+REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Connection pool: hosts kept in the pool, and the keep-alive connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '500'))
+# Per-host token bucket: sustained requests per second and burst size (0 disables the limit)
+HOST_RATE_LIMIT = float(os.getenv('HOST_RATE_LIMIT', '5'))
+HOST_RATE_BURST = int(os.getenv('HOST_RATE_BURST', '10'))
+# Transient failures (connection errors, timeouts, 429/502/503/504) are retried with exponential backoff
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.5'))
+HTTP_RETRY_MAX_DELAY = float(os.getenv('HTTP_RETRY_MAX_DELAY', '30'))
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# A host whose connections fail this many times in a row is left alone for CIRCUIT_OPEN_SECONDS
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_OPEN_SECONDS = int(os.getenv('CIRCUIT_OPEN_SECONDS', '300'))
+
+# DNS pre-resolution settings
+DNS_MAX_CONCURRENT = int(os.getenv('DNS_MAX_CONCURRENT', '50'))
+DNS_TIMEOUT = float(os.getenv('DNS_TIMEOUT', '10'))
+DNS_POSITIVE_TTL = int(os.getenv('DNS_POSITIVE_TTL', '300'))
+DNS_NEGATIVE_TTL = int(os.getenv('DNS_NEGATIVE_TTL', '60'))
+
+# Response bodies are streamed and never read past this many bytes
+MAX_BODY_BYTES = int(os.getenv('MAX_BODY_BYTES', str(2 * 1024 * 1024)))
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', str(64 * 1024)))
+
+# Last result per URL is kept here between runs
+RESULT_STORE_PATH = os.getenv('RESULT_STORE_PATH', 'linkchecker_results.db')
+# Stored verdicts are reused for unchanged pages, but never for longer than this
+REVALIDATE_MAX_AGE_HOURS = int(os.getenv('REVALIDATE_MAX_AGE_HOURS', '72'))
+# Only post URLs whose reported state changed since the last run
+SLACK_CHANGES_ONLY = os.getenv('SLACK_CHANGES_ONLY', 'false').lower() == 'true'
+
+# Page-template fingerprint cache for parked and expired landing pages
+FINGERPRINT_CACHE_SIZE = int(os.getenv('FINGERPRINT_CACHE_SIZE', '1000'))
+# A template is only trusted once it has rendered to the same verdict on this many domains
+FINGERPRINT_MIN_CONFIRMATIONS = int(os.getenv('FINGERPRINT_MIN_CONFIRMATIONS', '2'))
+
+# 'full' loads pages as a desktop browser would; 'lean' blocks resources the classifiers never read.
+# Stays opt-in until benchmarks/bench_render_profile.py has been run against Chrome and real parking pages.
+RENDER_PROFILE = os.getenv('RENDER_PROFILE', 'full')
+
+# Render readiness: wait for the DOM to go quiet instead of sleeping for a fixed time
+RENDER_SETTLE_BUDGET = float(os.getenv('RENDER_SETTLE_BUDGET', '5'))
+RENDER_QUIET_PERIOD = float(os.getenv('RENDER_QUIET_PERIOD', '1.0'))
+PLFRAME_WAIT_BUDGET = float(os.getenv('PLFRAME_WAIT_BUDGET', '10'))
+RENDER_POLL_INTERVAL = 0.1
+# What the old fixed waits cost: a 5s sleep, plus a 10s timeout on pages without plFrame
+LEGACY_SETTLE_SECONDS = 5.0
+LEGACY_PLFRAME_TIMEOUT = 10.0
+
+# Per-URL stage spans (JSON lines) and aggregate histograms (Prometheus text format); empty disables.
+# The span log is never rotated, so it is off unless a path is given, e.g. for profiling a run.
+SPAN_LOG_PATH = os.getenv('SPAN_LOG_PATH', '')
+METRICS_PATH = os.getenv('METRICS_PATH', 'linkchecker_metrics.prom')
+
+# Selenium render pool settings
+SELENIUM_POOL_SIZE = int(os.getenv('SELENIUM_POOL_SIZE', str(os.cpu_count() or 1)))
+RENDER_JOB_TIMEOUT = int(os.getenv('RENDER_JOB_TIMEOUT', '60'))
+# Drivers are recycled after this many pages, or when their Chrome uses more memory than the watermark
+DRIVER_MAX_PAGES = int(os.getenv('DRIVER_MAX_PAGES', '50'))
+DRIVER_RSS_WATERMARK_MB = int(os.getenv('DRIVER_RSS_WATERMARK_MB', '1024'))
+MEMORY_SAMPLE_INTERVAL = int(os.getenv('MEMORY_SAMPLE_INTERVAL', '5'))
+# Where the chrome/chromedriver pids each process starts are recorded; defaults to the work queue's directory
+BROWSER_PID_DIR = os.getenv('BROWSER_PID_DIR', '')
+
+# Pages with less visible static text than this are rendered before being called healthy
+STATIC_MIN_TEXT_LENGTH = int(os.getenv('STATIC_MIN_TEXT_LENGTH', '200'))
+
+# single: one process checks the whole sheet. coordinator: read the sheet, queue the URLs and
+# report; worker: check queued URLs. The mode can also be given as the first command-line argument.
+RUN_MODE = os.getenv('RUN_MODE', 'single')
+WORK_QUEUE_PATH = os.getenv('WORK_QUEUE_PATH', 'linkchecker_queue.db')
+# Local worker processes the coordinator starts; 0 if workers run in their own containers
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', '2'))
+WORK_BATCH_SIZE = int(os.getenv('WORK_BATCH_SIZE', '20'))
+# A leased URL goes back on the queue if its worker stops renewing the lease
+WORK_LEASE_SECONDS = int(os.getenv('WORK_LEASE_SECONDS', '120'))
+WORK_MAX_ATTEMPTS = int(os.getenv('WORK_MAX_ATTEMPTS', '3'))
+WORK_POLL_INTERVAL = 1.0
+# Local workers that keep dying are restarted with exponential backoff, at most WORKER_MAX_RESPAWNS
+# times per run. A run still unfinished after WORK_RUN_DEADLINE seconds (0 for no limit) is given up.
+WORKER_MAX_RESPAWNS = int(os.getenv('WORKER_MAX_RESPAWNS', '10'))
+WORKER_RESPAWN_MAX_DELAY = float(os.getenv('WORKER_RESPAWN_MAX_DELAY', '60'))
+WORK_RUN_DEADLINE = int(os.getenv('WORK_RUN_DEADLINE', '21600'))
+WORKER_EXIT_WHEN_IDLE = os.getenv('WORKER_EXIT_WHEN_IDLE', 'false').lower() == 'true'
+
+# daily: check the whole sheet at 10 AM Eastern. continuous: spread checks over the day,
+# checking risky URLs more often than stable ones
+SCHEDULER_MODE = os.getenv('SCHEDULER_MODE', 'daily')
+CHECK_INTERVAL_FAILING = int(os.getenv('CHECK_INTERVAL_FAILING', '900'))
+# URLs that failed or were added within the risk window, or that redirect to another host
+CHECK_INTERVAL_AT_RISK = int(os.getenv('CHECK_INTERVAL_AT_RISK', '3600'))
+CHECK_INTERVAL_STABLE = int(os.getenv('CHECK_INTERVAL_STABLE', str(6 * 3600)))
+RISK_WINDOW_HOURS = int(os.getenv('RISK_WINDOW_HOURS', '24'))
+# Each check is pushed back by up to this fraction of its interval so URLs drift apart
+SCHEDULE_JITTER = float(os.getenv('SCHEDULE_JITTER', '0.1'))
+# Overdue URLs found at startup are spread over this many seconds instead of all running at once
+SCHEDULE_STARTUP_SPREAD = int(os.getenv('SCHEDULE_STARTUP_SPREAD', '600'))
+SHEET_REFRESH_INTERVAL = int(os.getenv('SHEET_REFRESH_INTERVAL', '900'))
+SCHEDULER_BATCH_SIZE = int(os.getenv('SCHEDULER_BATCH_SIZE', '50'))
+SCHEDULER_TICK = 5
+
+class StageTimings:
+    """
+    Times the stages of a check. Every span is folded into a per-stage histogram that
+    write_metrics() exports to METRICS_PATH in the Prometheus text format, and appended to
+    SPAN_LOG_PATH as a JSON line if one is set. Histograms accumulate for the life of the
+    service. Spans can be recorded from the event loop and from render worker threads.
+    """
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 15, 30, 60)
+    
+    def __init__(self, span_path=SPAN_LOG_PATH, metrics_path=METRICS_PATH):
+        self.span_path = span_path
+        self.metrics_path = metrics_path
+        self.run_id = None
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._span_file = None
+    
+    def start_run(self):
+        self.run_id = datetime.now(pytz.utc).strftime('%Y%m%dT%H%M%SZ')
+    
+    @contextmanager
+    def span(self, stage, url=None, **attrs):
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, url, started_at, **attrs)
+    
+    def record(self, stage, duration, url=None, started_at=None, **attrs):
+        with self._lock:
+            histogram = self.histograms.setdefault(stage, {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.BUCKETS):
+                if duration <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += duration
+            histogram['count'] += 1
+            
+            if self.span_path:
+                if self._span_file is None:
+                    self._span_file = open(self.span_path, 'a', encoding='utf-8')
+                line = {'ts': started_at or time.time(), 'run_id': self.run_id, 'stage': stage,
+                        'url': url, 'duration': round(duration, 6)}
+                line.update(attrs)
+                self._span_file.write(json.dumps(line) + '\n')
+                self._span_file.flush()
+    
+    def snapshot(self):
+        """Return a copy of the histograms that can be sent as JSON."""
+        with self._lock:
+            return {stage: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                    for stage, h in self.histograms.items()}
+    
+    def merge(self, histograms, subtract=None):
+        """Add histograms from snapshot() into these, minus an earlier snapshot if given."""
+        subtract = subtract or {}
+        with self._lock:
+            for stage, other in histograms.items():
+                base = subtract.get(stage, {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0})
+                if other['count'] == base['count']:
+                    continue
+                histogram = self.histograms.setdefault(stage, {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0})
+                for i, (count, base_count) in enumerate(zip(other['buckets'], base['buckets'])):
+                    histogram['buckets'][i] += count - base_count
+                histogram['sum'] += other['sum'] - base['sum']
+                histogram['count'] += other['count'] - base['count']
+    
+    def write_metrics(self):
+        if not self.metrics_path:
+            return
+        lines = [
+            '# HELP linkchecker_stage_duration_seconds Time spent in each stage of a link check.',
+            '# TYPE linkchecker_stage_duration_seconds histogram',
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                for bound, count in zip(self.BUCKETS, histogram['buckets']):
+                    lines.append(f'linkchecker_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'linkchecker_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'linkchecker_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'linkchecker_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        
+        # Write then rename so a textfile collector never reads a half-written file
+        tmp_path = f'{self.metrics_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.metrics_path)
+
+TIMINGS = StageTimings()
+
 def send_slack_message(message):
     payload = {'text': message}
     try:
-        response = requests.post(SLACK_WEBHOOK_URL, json=payload)
+        with TIMINGS.span('slack_post'):
+            response = requests.post(SLACK_WEBHOOK_URL, json=payload)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         print(f"Error sending Slack message: {e}")
@@ -92,10 +320,257 @@ def get_domain_expiration_indicators():
             'renew domain',
             'restore domain',
             'reactivate domain'
+        ],
+        # Expiration messages found in page text (keeping existing ones that work)
+        'message_patterns': [
+            # Exact matches from screenshot
+            "the domain has expired. is this your domain?",
+            "the domain has expired. is this your domain? renew now",
+            "domain has expired. renew now",
+            
+            # Common variations that were working
+            "this domain has expired",
+            "domain name has expired",
+            "domain registration has expired",
+            "domain expired",
+            "expired domain",
+            "domain is expired",
+            "domain has lapsed",
+            "domain registration expired",
+            "this domain is expired",
+            "this domain name has expired",
+            "domain has been expired",
+            "domain registration has lapsed",
+            "domain has expired and is pending renewal",
+            "expired domain name",
+            "domain expiration notice"
+        ],
+        # Text inside the plFrame iframe of registrar parking pages
+        'frame_patterns': [
+            'domain has expired',
         ]
     }
 
-def setup_selenium():
+def get_special_error_indicators():
+    return {
+        # Cloudflare "Error 1000: DNS points to prohibited IP" pages
+        'error_1000_patterns': [
+            'error 1000',
+        ],
+        'cloudflare_patterns': [
+            'cloudflare',
+            'dns points to prohibited ip',
+            'dns points to',
+            'ray id:',
+        ],
+        # Chrome's own error page for hosts that don't resolve
+        'nxdomain_patterns': [
+            'dns_probe_finished_nxdomain',
+            "this site can't be reached",
+        ],
+    }
+
+class PatternMatcher:
+    """
+    Finds every indicator pattern in a page.
+    Patterns that share a word of five or more letters are grouped under the longest such
+    word, and a group is only searched for once its keyword is found, so most pages are
+    searched for about a dozen keywords rather than for every pattern. scan() returns
+    {category: set of matched patterns}, where the categories are the keys of the
+    indicator tables the matcher was built from.
+    """
+    def __init__(self, tables):
+        self.categories = {}
+        for category, patterns in tables.items():
+            for pattern in patterns:
+                self.categories.setdefault(pattern.lower(), set()).add(category)
+        
+        self.max_length = max(len(pattern) for pattern in self.categories)
+        words = {pattern: set(re.findall(r'\w{5,}', pattern)) for pattern in self.categories}
+        word_counts = Counter(word for pattern_words in words.values() for word in pattern_words)
+        self.patterns_by_keyword = {}
+        for pattern, pattern_words in words.items():
+            shared = [word for word in pattern_words if word_counts[word] > 1]
+            keyword = max(shared, key=lambda word: (len(word), word)) if shared else pattern
+            self.patterns_by_keyword.setdefault(keyword, []).append(pattern)
+    
+    def scan(self, text, hits=None):
+        return self.scan_lowercase(text.lower(), hits)
+    
+    def scan_lowercase(self, text, hits=None):
+        """scan() for text that has already been lowercased."""
+        hits = {} if hits is None else hits
+        for keyword, patterns in self.patterns_by_keyword.items():
+            if keyword not in text:
+                continue
+            for pattern in patterns:
+                if pattern == keyword or pattern in text:
+                    for category in self.categories[pattern]:
+                        hits.setdefault(category, set()).add(pattern)
+        return hits
+
+class StreamScanner:
+    """
+    Runs a PatternMatcher over text that arrives in chunks.
+    The lowercased tail of each chunk is carried into the next scan so patterns
+    that straddle a chunk boundary are still found.
+    """
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self.hits = {}
+        self.tail = ''
+    
+    def feed(self, chunk):
+        text = self.tail + chunk.lower()
+        self.matcher.scan_lowercase(text, self.hits)
+        self.tail = text[-(self.matcher.max_length - 1):]
+        return self.hits
+
+def first_hit(hits, *categories):
+    """Return the longest pattern matched in any of the given categories, or None."""
+    matched = set()
+    for category in categories:
+        matched |= hits.get(category, set())
+    return max(matched, key=len) if matched else None
+
+# Built once at startup from every indicator table
+PAGE_MATCHER = PatternMatcher({**get_domain_expiration_indicators(), **get_special_error_indicators()})
+
+def get_meta_refresh_target(soup):
+    meta = soup.find('meta', attrs={'http-equiv': re.compile('^refresh$', re.IGNORECASE)})
+    if not meta:
+        return None
+    match = re.search(r'url\s*=\s*[\'"]?([^\'"\s>]+)', meta.get('content', ''), re.IGNORECASE)
+    return match.group(1) if match else ''
+
+def analyze_static_content(content, response_url, hits):
+    """
+    Classify a 200 response from its raw HTML without a browser.
+    hits are the PAGE_MATCHER results for the same HTML.
+    Returns ('expired', reason) or ('healthy', reason) when the HTML is conclusive,
+    or (None, reason) when the page needs to be rendered.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Registrar expiration pages reached by redirect, meta refresh or iframe
+    meta_refresh = get_meta_refresh_target(soup)
+    iframe_srcs = [iframe.get('src', '') for iframe in soup.find_all('iframe')]
+    targets = [response_url or '', meta_refresh or ''] + iframe_srcs
+    for target in targets:
+        if 'registrar_patterns' in PAGE_MATCHER.scan(target):
+            return 'expired', f"Registrar expiration target: {target}"
+    
+    pattern = first_hit(hits, 'exact_patterns', 'message_patterns')
+    if pattern:
+        return 'expired', f"Found domain expiration message: {pattern}"
+    
+    # Anything that may only show its real content once JavaScript runs goes to the browser
+    if iframe_srcs or soup.find(id='plFrame'):
+        return None, "page embeds an iframe"
+    if soup.find(id='target'):
+        return None, "page has a #target placeholder"
+    if meta_refresh is not None:
+        return None, "page uses a meta refresh"
+    if 'cloudflare_patterns' in hits:
+        return None, "page mentions Cloudflare"
+    
+    for tag in soup(['script', 'style', 'noscript', 'template']):
+        tag.decompose()
+    text_length = len(' '.join(soup.get_text(' ').split()))
+    if text_length < STATIC_MIN_TEXT_LENGTH:
+        return None, f"only {text_length} characters of static text"
+    
+    return 'healthy', f"{text_length} characters of static text, no expiration indicators"
+
+def html_skeleton_fingerprint(content):
+    """
+    Hash the tag structure of a registrar parking page, ignoring its text and most attributes.
+    Parking templates served for different domains share a fingerprint. Digits in ids, classes
+    and iframe/script source paths are masked; the source's host and path are both kept.
+    Returns None for pages without the parking markers (#plFrame or #target): generic app
+    shells share skeletons across unrelated sites, so they must always be rendered.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    if not soup.find(id=('plFrame', 'target')):
+        return None
+    parts = []
+    for tag in soup.find_all(True):
+        part = tag.name
+        if tag.get('id'):
+            part += '#' + re.sub(r'\d+', '0', tag['id'])
+        if tag.get('class'):
+            part += '.' + '.'.join(sorted(re.sub(r'\d+', '0', cls) for cls in tag['class']))
+        if tag.name in ('iframe', 'script') and tag.get('src'):
+            src = urlparse(tag['src'])
+            part += '@' + (src.hostname or '') + re.sub(r'\d+', '0', src.path)
+        parts.append(part)
+    return hashlib.sha1(' '.join(parts).encode('utf-8')).hexdigest()
+
+class FingerprintCache:
+    """
+    LRU map from page-skeleton fingerprint to the verdict those pages rendered to.
+    Only verdicts in CACHEABLE_VERDICTS are served, and only after the template has produced
+    the same verdict on FINGERPRINT_MIN_CONFIRMATIONS different hosts. A template that ever
+    renders to two different verdicts is never served.
+    """
+    CACHEABLE_VERDICTS = ('expired', 'special_error')
+    
+    def __init__(self, max_size=FINGERPRINT_CACHE_SIZE, min_confirmations=FINGERPRINT_MIN_CONFIRMATIONS):
+        self.max_size = max_size
+        self.min_confirmations = min_confirmations
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, fingerprint):
+        entry = self.entries.get(fingerprint)
+        if (entry and not entry['conflict'] and entry['verdict'] in self.CACHEABLE_VERDICTS
+                and len(entry['hosts']) >= self.min_confirmations):
+            self.entries.move_to_end(fingerprint)
+            self.hits += 1
+            return entry['verdict']
+        self.misses += 1
+        return None
+    
+    def record(self, fingerprint, url, verdict):
+        entry = self.entries.get(fingerprint)
+        if entry is None:
+            entry = self.entries[fingerprint] = {'verdict': verdict, 'hosts': set(), 'conflict': False}
+        elif entry['verdict'] != verdict:
+            entry['conflict'] = True
+        # Several URLs on one parked host are one confirmation, not several
+        entry['hosts'].add((urlparse(url).hostname or url).lower())
+        self.entries.move_to_end(fingerprint)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+# Shared across runs for the lifetime of the service
+FINGERPRINT_CACHE = FingerprintCache()
+
+def get_lean_blocked_urls():
+    extensions = [
+        # Images, media and fonts: the classifiers only read text, iframes and span styles
+        '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp',
+        '.mp4', '.webm', '.ogg', '.mp3', '.wav', '.m3u8',
+        '.woff', '.woff2', '.ttf', '.otf', '.eot',
+        # Stylesheets; the styled-span checks read inline style attributes, not CSS files
+        '.css',
+    ]
+    # Third-party analytics, ads and trackers. Parking providers are deliberately not
+    # listed because they serve the plFrame content the expiration check reads.
+    hosts = [
+        'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'doubleclick.net',
+        'googleadservices.com', 'facebook.net', 'hotjar.com', 'clarity.ms', 'segment.io', 'segment.com',
+        'mixpanel.com', 'newrelic.com', 'nr-data.net', 'quantserve.com', 'scorecardresearch.com',
+        'adnxs.com', 'taboola.com', 'outbrain.com',
+    ]
+    return ([f'*{ext}' for ext in extensions] + [f'*{ext}?*' for ext in extensions]
+            + [f'*://{host}/*' for host in hosts] + [f'*.{host}/*' for host in hosts])
+
+def setup_selenium(profile=None):
+    profile = profile or RENDER_PROFILE
+    lean = profile == 'lean'
+    
     chrome_options = Options()
     chrome_options.add_argument('--headless=new')  # New headless mode
     chrome_options.add_argument('--no-sandbox')
@@ -105,137 +580,570 @@ def setup_selenium():
     chrome_options.add_argument('--ignore-certificate-errors')
     chrome_options.add_argument('--disable-http2')  # Disable HTTP/2 to avoid protocol errors
     chrome_options.add_argument('--disable-javascript-harmony-shipping')
-    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--window-size=1280,800' if lean else '--window-size=1920,1080')
     chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
     
+    if lean:
+        # Hand control back once the DOM is parsed; the readiness wait covers dynamic content
+        chrome_options.page_load_strategy = 'eager'
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+    
     # Add experimental options
     chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
     chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
     chrome_options.add_experimental_option('useAutomationExtension', False)
     
-    return webdriver.Chrome(options=chrome_options)
+    driver = webdriver.Chrome(options=chrome_options)
+    if lean:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': get_lean_blocked_urls()})
+        except Exception as e:
+            print(f"Could not enable request blocking, rendering with the full profile: {e}")
+    return driver
+
+def list_processes():
+    """Map pid -> (ppid, command name) for every process visible in /proc (Linux only)."""
+    processes = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                stat = f.read()
+            # The command name is in parentheses and may contain spaces
+            name = stat[stat.index('(') + 1:stat.rindex(')')]
+            ppid = int(stat.rsplit(')', 1)[1].split()[1])
+            processes[int(entry)] = (ppid, name)
+        except (OSError, ValueError, IndexError):
+            continue
+    return processes
+
+def descendant_pids(pid, processes=None):
+    """Return pid and the pids of all of its descendants."""
+    processes = processes if processes is not None else list_processes()
+    children = {}
+    for child, (ppid, _) in processes.items():
+        children.setdefault(ppid, []).append(child)
+    
+    found = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        found.append(current)
+        pending.extend(children.get(current, []))
+    return found
+
+def process_tree_rss(pid):
+    """Return the total resident memory in bytes of a process and all of its descendants."""
+    total = 0
+    for current in descendant_pids(pid):
+        try:
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            continue
+    return total
+
+def summarize_memory(samples):
+    """Peak and steady-state (median of the second half of the run) RSS from byte samples, in MB."""
+    steady = samples[len(samples) // 2:]
+    return {
+        'peak_mb': max(samples) / 1024 / 1024,
+        'steady_mb': statistics.median(steady) / 1024 / 1024,
+    }
+
+def kill_browser_processes(pids, processes):
+    """SIGKILL the chrome/chromedriver processes among pids. Returns the number killed."""
+    killed = 0
+    for pid in pids:
+        if pid not in processes:
+            continue
+        ppid, name = processes[pid]
+        if not name.startswith('chrome'):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except OSError:
+            continue
+        if ppid == os.getpid():
+            # Reap it ourselves; when this service runs as PID 1 nothing else will
+            try:
+                os.waitpid(pid, os.WNOHANG)
+            except OSError:
+                pass
+    return killed
+
+def process_start_time(pid):
+    """Return a process's start time in clock ticks since boot, or None if it no longer exists."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return int(f.read().rsplit(')', 1)[1].split()[19])
+    except (OSError, ValueError, IndexError):
+        return None
 
-def analyze_domain_status(content, domain, response_url, title, driver=None):
+def browser_pidfile(owner=None):
+    """The file listing the chrome/chromedriver processes started by a linkchecker process."""
+    directory = BROWSER_PID_DIR or os.path.dirname(os.path.abspath(WORK_QUEUE_PATH))
+    return os.path.join(directory, f'linkchecker-browsers-{owner or os.getpid()}.pids')
+
+def save_browser_pids(pids):
+    """Record this process's live browser pids, with their start times so reused pids are never mistaken for them."""
+    lines = []
+    for pid in sorted(pids):
+        start_time = process_start_time(pid)
+        if start_time is not None:
+            lines.append(f'{pid} {start_time}\n')
+    path = browser_pidfile()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.writelines(lines)
+    os.replace(tmp_path, path)
+
+def kill_orphaned_browsers():
     """
-    Analyze domain content to determine if it's truly expired.
-    Checks for various common expiration message patterns.
+    Kill chrome and chromedriver processes left behind by this process or by linkchecker
+    processes that have exited, as listed in their pidfiles. Only listed pids whose start
+    time still matches are touched, so Chrome started by anything else is left alone.
+    Only call this while none of this process's drivers is running or starting.
+    Returns the number of processes killed.
     """
+    directory = os.path.dirname(browser_pidfile())
+    pattern = re.compile(r'linkchecker-browsers-(\d+)\.pids$')
     try:
-        # If we have a Selenium driver, get the JavaScript-rendered content
-        if driver:
+        filenames = os.listdir(directory)
+        processes = list_processes()
+    except OSError:
+        return 0
+    
+    killed = 0
+    for filename in filenames:
+        match = pattern.match(filename)
+        if not match:
+            continue
+        owner = int(match.group(1))
+        if owner != os.getpid() and process_start_time(owner) is not None:
+            # A running linkchecker process still owns these browsers
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            with open(path) as f:
+                entries = [line.split() for line in f if line.strip()]
+        except OSError:
+            continue
+        pids = [int(pid) for pid, start_time in entries if process_start_time(int(pid)) == int(start_time)]
+        killed += kill_browser_processes(pids, processes)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    if killed:
+        print(f"Killed {killed} orphaned chrome/chromedriver processes")
+    return killed
+
+def driver_rss(driver):
+    """Resident memory of a driver's chromedriver and Chrome processes, in bytes."""
+    try:
+        return process_tree_rss(driver.service.process.pid)
+    except Exception:
+        return 0
+
+def driver_is_alive(driver):
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+def reset_driver_state(driver):
+    """Clear cookies, storage and cache left by the last domain and release its page."""
+    try:
+        driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+        driver.delete_all_cookies()
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        driver.get('about:blank')
+    except Exception as e:
+        print(f"Error clearing driver state: {e}")
+
+def kill_driver(driver):
+    """Force-stop a driver whose session can no longer be trusted to quit cleanly."""
+    try:
+        driver.service.process.kill()
+    except Exception:
+        pass
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def resolve_future(future, result=None, exception=None):
+    """Resolve a render job's future unless the worker or the watchdog already has."""
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+class DriverPool:
+    """
+    A pool of headless Chrome drivers fed from a shared render queue.
+    Each worker thread owns one driver and runs jobs of the form fn(driver, *args).
+    A job that runs past RENDER_JOB_TIMEOUT is failed and its driver killed;
+    drivers that crash are replaced before the next job. Browser state is cleared
+    between jobs, and a driver is recycled after max_pages jobs or once its Chrome
+    grows past the RSS watermark. Memory of the whole process tree is sampled
+    while the pool runs.
+    """
+    def __init__(self, size=SELENIUM_POOL_SIZE, job_timeout=RENDER_JOB_TIMEOUT,
+                 max_pages=DRIVER_MAX_PAGES, rss_watermark_mb=DRIVER_RSS_WATERMARK_MB):
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        self.max_pages = max_pages
+        self.rss_watermark = rss_watermark_mb * 1024 * 1024
+        self.jobs = queue.Queue()
+        self.jobs_run = 0
+        self.jobs_timed_out = 0
+        self.drivers_replaced = 0
+        self.drivers_recycled = 0
+        self.memory_samples = []
+        self.browser_pids = set()
+        self._lock = threading.Lock()
+        self._running = {}
+        self._threads = []
+        self._closed = threading.Event()
+    
+    def start(self):
+        kill_orphaned_browsers()
+        print(f"Starting {self.size} Selenium render workers...")
+        for index in range(self.size):
+            thread = threading.Thread(target=self._run_worker, args=(index,), name=f"render-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        watchdog = threading.Thread(target=self._watch_timeouts, name="render-watchdog", daemon=True)
+        watchdog.start()
+        self._threads.append(watchdog)
+        return self
+    
+    def submit(self, fn, *args):
+        future = Future()
+        self.jobs.put((future, fn, args))
+        return future
+    
+    async def render(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+    
+    def _new_driver(self):
+        driver = setup_selenium()
+        self._track_driver(driver)
+        driver.set_page_load_timeout(self.job_timeout)
+        driver.set_script_timeout(self.job_timeout)
+        return driver
+    
+    def _track_driver(self, driver):
+        """Add a driver's chromedriver and Chrome processes to this process's pidfile."""
+        try:
+            pids = set(descendant_pids(driver.service.process.pid))
+        except Exception:
+            return
+        with self._lock:
+            if pids - self.browser_pids:
+                self.browser_pids |= pids
+                save_browser_pids(self.browser_pids)
+    
+    def _retire_driver(self, index, driver, reason=None):
+        """Quit a driver, then kill whatever is left of its own process tree."""
+        if reason:
+            print(f"Render worker {index}: {reason}")
+        try:
+            tree = descendant_pids(driver.service.process.pid)
+        except Exception:
+            tree = []
+        try:
+            driver.quit()
+        except Exception:
+            kill_driver(driver)
+        # Other workers may be starting drivers right now, so only this driver's processes are touched
+        try:
+            killed = kill_browser_processes(tree, list_processes())
+        except OSError:
+            killed = 0
+        with self._lock:
+            self.browser_pids -= set(tree)
+            save_browser_pids(self.browser_pids)
+        if killed:
+            print(f"Render worker {index}: killed {killed} leftover chrome/chromedriver processes")
+    
+    def _run_worker(self, index):
+        driver = None
+        pages = 0
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            future, fn, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            
             try:
-                print("\n=== Checking for domain expiration ===")
-                driver.get(domain)
-                
-                # Wait for body to load
-                WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
-                
-                # Wait a moment for dynamic content
-                time.sleep(5)  # Increased wait time for iframe load
+                if driver is None:
+                    driver = self._new_driver()
+                    pages = 0
+                with self._lock:
+                    self._running[index] = (driver, future, time.monotonic() + self.job_timeout)
+                result = fn(driver, *args)
+                resolve_future(future, result=result)
+            except Exception as e:
+                resolve_future(future, exception=e)
+            finally:
+                with self._lock:
+                    self._running.pop(index, None)
+                    self.jobs_run += 1
+            
+            if driver is None:
+                continue
+            # Chrome starts renderer processes as it goes; record them too
+            self._track_driver(driver)
+            if not driver_is_alive(driver):
+                kill_driver(driver)
+                self._retire_driver(index, driver, "driver crashed, replacing it")
+                driver = None
+                with self._lock:
+                    self.drivers_replaced += 1
+                continue
+            
+            pages += 1
+            rss = driver_rss(driver)
+            if pages >= self.max_pages or rss > self.rss_watermark:
+                self._retire_driver(index, driver, f"recycling driver after {pages} pages ({rss / 1024 / 1024:.0f}MB)")
+                driver = None
+                with self._lock:
+                    self.drivers_recycled += 1
+            else:
+                reset_driver_state(driver)
+        
+        if driver is not None:
+            self._retire_driver(index, driver)
+    
+    def _watch_timeouts(self):
+        last_sample = 0
+        while not self._closed.wait(1):
+            now = time.monotonic()
+            if now - last_sample >= MEMORY_SAMPLE_INTERVAL:
+                self.memory_samples.append(process_tree_rss(os.getpid()))
+                last_sample = now
+            with self._lock:
+                overdue = [(index, driver, future) for index, (driver, future, deadline) in self._running.items() if now > deadline]
+                for index, _, _ in overdue:
+                    self._running.pop(index, None)
+                    self.jobs_timed_out += 1
+            for index, driver, future in overdue:
+                print(f"Render worker {index}: job exceeded {self.job_timeout}s, killing its driver")
+                resolve_future(future, exception=TimeoutError(f"Render job exceeded {self.job_timeout}s"))
+                # The worker notices the dead driver once the job unwinds and replaces it
+                kill_driver(driver)
+    
+    def memory_summary(self, reset=False):
+        """Summarize the memory sampled since the pool started, or since the last reset."""
+        samples = self.memory_samples + [process_tree_rss(os.getpid())]
+        if reset:
+            self.memory_samples = []
+        return summarize_memory(samples)
+    
+    def close(self):
+        for _ in range(self.size):
+            self.jobs.put(None)
+        for thread in self._threads[:self.size]:
+            thread.join(timeout=self.job_timeout)
+        memory = self.memory_summary()
+        self._closed.set()
+        kill_orphaned_browsers()
+        print(f"Render pool: {self.jobs_run} jobs, {self.jobs_timed_out} timed out, "
+              f"{self.drivers_replaced} drivers replaced, {self.drivers_recycled} recycled")
+        print(f"Memory: peak {memory['peak_mb']:.0f}MB, steady state {memory['steady_mb']:.0f}MB")
+
+READINESS_SCRIPT = """
+    if (!window.__linkcheckerObserver) {
+        window.__linkcheckerLastMutation = performance.now();
+        window.__linkcheckerObserver = new MutationObserver(function() {
+            window.__linkcheckerLastMutation = performance.now();
+        });
+        window.__linkcheckerObserver.observe(document, {
+            childList: true, subtree: true, attributes: true, characterData: true
+        });
+    }
+    return {
+        readyState: document.readyState,
+        quietMs: performance.now() - window.__linkcheckerLastMutation,
+        plFrame: !!document.getElementById('plFrame')
+    };
+"""
+
+def wait_for_page_ready(driver, budget=RENDER_SETTLE_BUDGET, quiet_period=RENDER_QUIET_PERIOD):
+    """
+    Wait until the page has settled or a decisive element has appeared, whichever comes first.
+    Settled means the document has finished loading and the DOM has not changed for quiet_period.
+    Returns the reason ('plframe', 'settled' or 'budget') and the seconds waited.
+    """
+    start = time.monotonic()
+    while True:
+        try:
+            state = driver.execute_script(READINESS_SCRIPT) or {}
+        except Exception as e:
+            # e.g. a navigation replaced the document mid-poll; keep polling within the budget
+            print(f"Error checking page readiness: {e}")
+            state = {}
+        elapsed = time.monotonic() - start
+        if state.get('plFrame'):
+            return 'plframe', elapsed
+        if state.get('readyState') == 'complete' and state.get('quietMs', 0) >= quiet_period * 1000:
+            return 'settled', elapsed
+        if elapsed >= budget:
+            return 'budget', elapsed
+        time.sleep(RENDER_POLL_INTERVAL)
+
+def capture_page_snapshot(driver, domain):
+    """
+    Render a URL once and capture everything the classifiers need from the browser:
+    the page source, the span text inside the plFrame iframe and the text of styled spans.
+    """
+    print(f"\n=== Rendering {domain} ===")
+    with TIMINGS.span('render_load', domain):
+        driver.get(domain)
+    
+    # Wait for body to load
+    with TIMINGS.span('render_body_wait', domain):
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+    
+    # Return as soon as the page settles or plFrame shows up, rather than sleeping
+    with TIMINGS.span('render_settle', domain):
+        ready_reason, settle_seconds = wait_for_page_ready(driver)
+    wait_seconds = settle_seconds
+    legacy_wait_seconds = LEGACY_SETTLE_SECONDS
+    
+    frame_texts = []
+    try:
+        # First make the target div visible
+        has_target = driver.execute_script("""
+            var target = document.getElementById('target');
+            if (target) {
+                target.style.opacity = '1';
+                target.style.visibility = 'visible';
+                target.style.display = 'block';
+            }
+            return !!target;
+        """)
+        
+        # Look specifically for plFrame. Parking templates have a #target placeholder and may
+        # still be inserting the iframe; on any other page a missing plFrame is final.
+        with TIMINGS.span('render_plframe', domain, ready=ready_reason):
+            plframe_start = time.monotonic()
+            try:
+                iframes = driver.find_elements(By.ID, "plFrame")
+                if not iframes and has_target:
+                    iframes = [WebDriverWait(driver, PLFRAME_WAIT_BUDGET).until(
+                        EC.presence_of_element_located((By.ID, "plFrame"))
+                    )]
                 
-                try:
-                    # First make the target div visible
-                    driver.execute_script("""
-                        var target = document.getElementById('target');
-                        if (target) {
-                            target.style.opacity = '1';
-                            target.style.visibility = 'visible';
-                            target.style.display = 'block';
-                        }
-                    """)
+                if iframes:
+                    print(f"{domain}: Found plFrame iframe")
                     
-                    # Look specifically for plFrame
-                    try:
-                        iframe = WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.ID, "plFrame"))
-                        )
-                        print("Found plFrame iframe")
-                        
-                        # Switch to the iframe
-                        driver.switch_to.frame(iframe)
-                        
-                        # Wait for and get the content
-                        WebDriverWait(driver, 10).until(
-                            EC.presence_of_element_located((By.TAG_NAME, "span"))
-                        )
-                        
-                        # Get all spans and their text
-                        spans = driver.find_elements(By.TAG_NAME, "span")
-                        for span in spans:
-                            try:
-                                text = span.text.strip().lower()
-                                print(f"Found text in plFrame: {text}")
-                                if "domain has expired" in text:
-                                    driver.switch_to.default_content()
-                                    return True, f"Found expired domain message: {text}"
-                            except Exception as e:
-                                print(f"Error reading span text: {e}")
-                                continue
-                        
-                        driver.switch_to.default_content()
-                    except Exception as e:
-                        print(f"Error with plFrame: {e}")
-                        driver.switch_to.default_content()
-                
-                except Exception as e:
-                    print(f"Error making target visible: {e}")
-                
-                # Keep all existing checks (they're working for other cases)
-                page_text = driver.page_source.lower()
-                
-                # Common expiration message patterns (keeping existing ones that work)
-                expiration_patterns = [
-                    # Exact matches from screenshot
-                    "the domain has expired. is this your domain?",
-                    "the domain has expired. is this your domain? renew now",
-                    "domain has expired. renew now",
+                    # Switch to the iframe
+                    driver.switch_to.frame(iframes[0])
                     
-                    # Common variations that were working
-                    "this domain has expired",
-                    "domain name has expired",
-                    "domain registration has expired",
-                    "domain expired",
-                    "expired domain",
-                    "domain is expired",
-                    "domain has lapsed",
-                    "domain registration expired",
-                    "this domain is expired",
-                    "this domain name has expired",
-                    "domain has been expired",
-                    "domain registration has lapsed",
-                    "domain has expired and is pending renewal",
-                    "expired domain name",
-                    "domain expiration notice"
-                ]
-                
-                # Check for patterns in the page source
-                for pattern in expiration_patterns:
-                    if pattern in page_text:
-                        print(f"Found expiration message: {pattern}")
-                        return True, f"Found domain expiration message: {pattern}"
-                
-                # Keep existing span checks that were working
-                span_selectors = [
-                    "span[style*='font-family:Arial']",
-                    "span[style*='font-size']",
-                    "span.expired-domain",
-                    "span.domain-expired",
-                    "div.expired-notice"
-                ]
-                
-                for selector in span_selectors:
-                    spans = driver.find_elements(By.CSS_SELECTOR, selector)
-                    for span in spans:
-                        text = span.text.strip().lower()
-                        for pattern in expiration_patterns:
-                            if pattern in text:
-                                print(f"Found expiration message in styled element: {text}")
-                                return True, f"Found domain expiration message: {text}"
-                
+                    # Wait for and get the content
+                    WebDriverWait(driver, PLFRAME_WAIT_BUDGET).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "span"))
+                    )
+                    
+                    # Get all spans and their text
+                    for span in driver.find_elements(By.TAG_NAME, "span"):
+                        try:
+                            text = span.text.strip().lower()
+                            print(f"{domain}: Found text in plFrame: {text}")
+                            frame_texts.append(text)
+                        except Exception as e:
+                            print(f"{domain}: Error reading span text: {e}")
+                            continue
+                else:
+                    legacy_wait_seconds += LEGACY_PLFRAME_TIMEOUT
             except Exception as e:
-                print(f"Error checking JavaScript content: {e}")
+                print(f"{domain}: Error with plFrame: {e}")
+            finally:
+                driver.switch_to.default_content()
+                wait_seconds += time.monotonic() - plframe_start
+    
+    except Exception as e:
+        print(f"{domain}: Error making target visible: {e}")
+    
+    page_source = driver.page_source
+    
+    span_selectors = [
+        "span[style*='font-family:Arial']",
+        "span[style*='font-size']",
+        "span.expired-domain",
+        "span.domain-expired",
+        "div.expired-notice"
+    ]
+    
+    styled_texts = []
+    with TIMINGS.span('render_styled_spans', domain):
+        for selector in span_selectors:
+            try:
+                for span in driver.find_elements(By.CSS_SELECTOR, selector):
+                    styled_texts.append(span.text.strip().lower())
+            except Exception as e:
+                print(f"{domain}: Error reading {selector} elements: {e}")
+    
+    return {
+        'url': domain,
+        'page_source': page_source,
+        'frame_texts': frame_texts,
+        'styled_texts': styled_texts,
+        'page_hits': PAGE_MATCHER.scan(page_source),
+        'frame_hits': PAGE_MATCHER.scan('\n'.join(frame_texts)),
+        'styled_hits': PAGE_MATCHER.scan('\n'.join(styled_texts)),
+        'ready_reason': ready_reason,
+        'wait_seconds': wait_seconds,
+        'legacy_wait_seconds': legacy_wait_seconds,
+    }
+
+def analyze_domain_status(content, domain, response_url, title, snapshot=None):
+    """
+    Analyze domain content to determine if it's truly expired.
+    Checks for various common expiration message patterns in a rendered page snapshot.
+    """
+    try:
+        # If we have a rendered snapshot, check the JavaScript-rendered content
+        if snapshot:
+            print(f"\n=== Checking for domain expiration: {domain} ===")
+            pattern = first_hit(snapshot['frame_hits'], 'frame_patterns')
+            if pattern:
+                return True, f"Found expired domain message in plFrame: {pattern}"
+            
+            # Check for patterns in the page source
+            pattern = first_hit(snapshot['page_hits'], 'message_patterns')
+            if pattern:
+                print(f"Found expiration message: {pattern}")
+                return True, f"Found domain expiration message: {pattern}"
+            
+            # Keep existing span checks that were working
+            pattern = first_hit(snapshot['styled_hits'], 'message_patterns')
+            if pattern:
+                print(f"Found expiration message in styled element: {pattern}")
+                return True, f"Found domain expiration message: {pattern}"
         
         return False, None
         
@@ -243,164 +1151,1339 @@ def analyze_domain_status(content, domain, response_url, title, driver=None):
         print(f"Error in analyze_domain_status: {str(e)}")
         return False, None
 
-async def check_links():
+async def system_resolve(host, executor=None):
+    loop = asyncio.get_running_loop()
+    infos = await loop.run_in_executor(executor, lambda: socket.getaddrinfo(host, None, type=socket.SOCK_STREAM))
+    return sorted({info[4][0] for info in infos})
+
+# getaddrinfo errors that mean the name doesn't exist, as opposed to a temporary failure
+NXDOMAIN_ERRORS = {socket.EAI_NONAME} | ({socket.EAI_NODATA} if hasattr(socket, 'EAI_NODATA') else set())
+
+class HostResolver:
+    """
+    Resolves hostnames concurrently ahead of the HTTP stage, with positive and negative TTL caches.
+    resolve_fn is a coroutine function taking a hostname and returning its addresses, raising
+    socket.gaierror on failure. It defaults to the system resolver and can be replaced by a stub.
+    Results are 'resolved', 'nxdomain' or 'unknown'; only 'nxdomain' is cached negatively,
+    so temporary failures are left for the HTTP stage to retry.
+    System lookups run on the resolver's own max_concurrent threads, and a lookup keeps its
+    concurrency slot until its thread is free again, even after timing out. A lookup therefore
+    never waits for a thread, and the timeout measures only the lookup itself.
+    """
+    def __init__(self, resolve_fn=None, positive_ttl=DNS_POSITIVE_TTL, negative_ttl=DNS_NEGATIVE_TTL,
+                 max_concurrent=DNS_MAX_CONCURRENT, timeout=DNS_TIMEOUT):
+        if resolve_fn is None:
+            self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='dns')
+            resolve_fn = lambda host: system_resolve(host, self.executor)
+        self.resolve_fn = resolve_fn
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.cache = {}
+        self.cache_hits = 0
+    
+    def cached(self, host):
+        entry = self.cache.get(host)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+        return None
+    
+    async def resolve(self, host, limit):
+        status = self.cached(host)
+        if status:
+            self.cache_hits += 1
+            return status
+        
+        await limit.acquire()
+        lookup = asyncio.ensure_future(self.resolve_fn(host))
+        lookup.add_done_callback(lambda done: (limit.release(), done.cancelled() or done.exception()))
+        try:
+            with TIMINGS.span('dns_lookup', host=host):
+                await asyncio.wait_for(asyncio.shield(lookup), timeout=self.timeout)
+            status = 'resolved'
+            self.cache[host] = (status, time.monotonic() + self.positive_ttl)
+        except socket.gaierror as e:
+            if e.errno in NXDOMAIN_ERRORS:
+                status = 'nxdomain'
+                self.cache[host] = (status, time.monotonic() + self.negative_ttl)
+            else:
+                status = 'unknown'
+        except Exception:
+            status = 'unknown'
+        return status
+    
+    async def resolve_all(self, hosts):
+        """Resolve all hosts concurrently and return {host: status}."""
+        hosts = list(dict.fromkeys(host for host in hosts if host))
+        limit = asyncio.Semaphore(self.max_concurrent)
+        start = time.monotonic()
+        cache_hits = self.cache_hits
+        statuses = await asyncio.gather(*(self.resolve(host, limit) for host in hosts))
+        results = dict(zip(hosts, statuses))
+        
+        counts = Counter(results.values())
+        print(f"DNS: resolved {len(hosts)} hosts in {time.monotonic() - start:.1f}s "
+              f"({counts['resolved']} resolved, {counts['nxdomain']} NXDOMAIN, {counts['unknown']} unknown, "
+              f"{self.cache_hits - cache_hits} from cache)")
+        return results
+
+# Shared across runs so the TTL caches outlive a single check
+HOST_RESOLVER = HostResolver()
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of making a request to a host whose circuit breaker is open."""
+
+class TokenBucket:
+    """An asyncio token bucket: rate tokens per second, holding at most capacity."""
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class ConnectCounter:
+    """Counts TCP connects made by the probe connection pools, including urllib3's silent reconnects."""
+    lock = threading.Lock()
+    connects = 0
+    
+    @classmethod
+    def add(cls):
+        with cls.lock:
+            cls.connects += 1
+
+class CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        ConnectCounter.add()
+        super().connect()
+
+class CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        ConnectCounter.add()
+        super().connect()
+
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CountingHTTPConnection
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CountingHTTPSConnection
+
+class HttpClient:
+    """
+    The shared HTTP layer: one requests.Session whose connection pool keeps connections
+    alive across URLs and runs, plus per-host token buckets and circuit breakers.
+    A host's circuit opens after CIRCUIT_FAILURE_THRESHOLD consecutive connection failures
+    (any HTTP response, even a 503, shows the host is up); once CIRCUIT_OPEN_SECONDS have
+    passed, one trial request decides whether it closes again.
+    The session is used from the probe threads; buckets, circuits and counters belong to the event loop.
+    """
+    def __init__(self, rate=HOST_RATE_LIMIT, burst=HOST_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.session = requests.Session()
+        self.session.headers.update(REQUEST_HEADERS)
+        # The session lives as long as the service; keep no cookies between requests, as separate
+        # requests.get() calls never did. Cookies set within one redirect chain still apply to it.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=MAX_REQUESTS_PER_HOST)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        # Count real connects: a pool's num_connections misses reconnects of dropped keep-alive connections
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+        # Keep the request counts of pools the pool manager evicts so pool_stats() stays cumulative
+        self.retired_requests = 0
+        pools = self.adapter.poolmanager.pools
+        pools.dispose_func = self._retire_pool
+        
+        self.buckets = {}
+        self.failures = Counter()
+        self.opened_at = {}
+        self.retries = 0
+        self.rejected = 0
+    
+    def _retire_pool(self, pool):
+        self.retired_requests += pool.num_requests
+        pool.close()
+    
+    def pool_stats(self):
+        """Return (requests sent, TCP connects made) over the life of the process."""
+        requests_sent = self.retired_requests
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests_sent += pool.num_requests
+        return requests_sent, ConnectCounter.connects
+    
+    async def throttle(self, host):
+        if self.rate <= 0:
+            return
+        bucket = self.buckets.setdefault(host, TokenBucket(self.rate, self.burst))
+        await bucket.acquire()
+    
+    def allow(self, host):
+        """Return whether a request to host may go out now."""
+        opened_at = self.opened_at.get(host)
+        if opened_at is None:
+            return True
+        if time.monotonic() - opened_at >= CIRCUIT_OPEN_SECONDS:
+            # Half-open: let this request through as the trial and hold everything else back
+            self.opened_at[host] = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+    
+    def record(self, host, ok):
+        if ok:
+            self.failures.pop(host, None)
+            self.opened_at.pop(host, None)
+            return
+        self.failures[host] += 1
+        if self.failures[host] >= CIRCUIT_FAILURE_THRESHOLD:
+            if host not in self.opened_at:
+                print(f"Circuit opened for {host} after {self.failures[host]} consecutive failures")
+            self.opened_at[host] = time.monotonic()
+
+HTTP_CLIENT = HttpClient()
+
+def is_transient(result, error):
+    """Return whether a fetch failed in a way worth retrying."""
+    if error is not None:
+        # Certificate and URL problems fail the same way every time (SSLError is a ConnectionError)
+        if isinstance(error, (CircuitOpenError, requests.exceptions.SSLError, requests.exceptions.InvalidURL,
+                              requests.exceptions.InvalidSchema)) or is_dns_error(error):
+            return False
+        return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                  requests.exceptions.ChunkedEncodingError))
+    return result['response'].status_code in RETRY_STATUS_CODES
+
+def retry_delay(attempt, result):
+    """Exponential backoff with full jitter, honouring a numeric Retry-After header."""
+    delay = random.uniform(0, HTTP_RETRY_BACKOFF * 2 ** attempt)
+    retry_after = result['response'].headers.get('Retry-After') if result else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, int(retry_after))
+    return min(delay, HTTP_RETRY_MAX_DELAY)
+
+def is_decisive(hits):
+    """Return whether the hits already settle the verdict, so the rest of the body isn't needed."""
+    return bool(find_special_error(hits) or first_hit(hits, 'exact_patterns', 'message_patterns'))
+
+def fetch_url(domain, extra_headers=None):
+    """
+    GET a URL and stream its body in STREAM_CHUNK_SIZE chunks, scanning each chunk as it arrives.
+    Reading stops at MAX_BODY_BYTES, or as soon as a decisive indicator has been seen.
+    """
+    with HTTP_CLIENT.session.get(domain, timeout=REQUEST_TIMEOUT, headers=extra_headers,
+                                 allow_redirects=True, stream=True) as response:
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        scanner = StreamScanner(PAGE_MATCHER)
+        body_hash = hashlib.sha256()
+        parts = []
+        bytes_read = 0
+        truncated = False
+        stopped_early = False
+        
+        for chunk in response.iter_content(chunk_size=STREAM_CHUNK_SIZE):
+            if bytes_read + len(chunk) > MAX_BODY_BYTES:
+                chunk = chunk[:MAX_BODY_BYTES - bytes_read]
+                truncated = True
+            bytes_read += len(chunk)
+            body_hash.update(chunk)
+            text = decoder.decode(chunk, final=truncated)
+            parts.append(text)
+            scanner.feed(text)
+            if truncated:
+                break
+            if is_decisive(scanner.hits):
+                stopped_early = True
+                break
+        else:
+            parts.append(decoder.decode(b'', final=True))
+    
+    return {
+        'response': response,
+        'body': ''.join(parts),
+        'hits': scanner.hits,
+        'body_hash': body_hash.hexdigest(),
+        'bytes_read': bytes_read,
+        'truncated': truncated,
+        'stopped_early': stopped_early,
+    }
+
+def empty_probe(domain, error=None, elapsed=0.0):
+    """A probe result for a URL that produced no response."""
+    return {'domain': domain, 'response': None, 'error': error, 'elapsed': elapsed,
+            'body': '', 'hits': {}, 'body_hash': None, 'bytes_read': 0, 'truncated': False, 'stopped_early': False}
+
+async def probe_url(domain, executor, global_limit, host_limits, extra_headers=None):
+    """
+    Fetch a single URL without blocking the event loop.
+    Waits for a per-host slot and a token from the host's bucket, then holds a global slot
+    while the request runs. Transient failures are retried up to HTTP_MAX_RETRIES times
+    unless the host's circuit is open.
+    """
+    host = (urlparse(domain).hostname or domain).lower()
+    host_limit = host_limits.setdefault(host, asyncio.Semaphore(MAX_REQUESTS_PER_HOST))
+    loop = asyncio.get_running_loop()
+    start = time.monotonic()
+    
+    async with host_limit:
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            if not HTTP_CLIENT.allow(host):
+                return empty_probe(domain, CircuitOpenError(f"Circuit open for {host}, request skipped"),
+                                   time.monotonic() - start)
+            await HTTP_CLIENT.throttle(host)
+            
+            result, error = None, None
+            async with global_limit:
+                try:
+                    with TIMINGS.span('http_fetch', domain, attempt=attempt):
+                        result = await loop.run_in_executor(executor, fetch_url, domain, extra_headers)
+                except Exception as e:
+                    error = e
+            
+            transient = is_transient(result, error)
+            HTTP_CLIENT.record(host, ok=not (transient and error is not None))
+            if not transient or attempt == HTTP_MAX_RETRIES:
+                break
+            HTTP_CLIENT.retries += 1
+            await asyncio.sleep(retry_delay(attempt, result))
+    
+    if error is not None:
+        return empty_probe(domain, error, time.monotonic() - start)
+    result.update({'domain': domain, 'error': None, 'elapsed': time.monotonic() - start})
+    return result
+
+async def probe_urls(domains, conditional_headers=None):
+    """
+    Fetch all URLs concurrently and return the probe results keyed by URL.
+    Concurrency is bounded by MAX_CONCURRENT_REQUESTS overall and MAX_REQUESTS_PER_HOST per host.
+    conditional_headers optionally maps a URL to If-None-Match/If-Modified-Since headers.
+    """
+    conditional_headers = conditional_headers or {}
+    unique_domains = list(dict.fromkeys(domains))
+    if not unique_domains:
+        return {}
+    
+    global_limit = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    host_limits = {}
+    requests_before, connections_before = HTTP_CLIENT.pool_stats()
+    retries_before, rejected_before = HTTP_CLIENT.retries, HTTP_CLIENT.rejected
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        results = await asyncio.gather(*(
+            probe_url(domain, executor, global_limit, host_limits, conditional_headers.get(domain))
+            for domain in unique_domains
+        ))
+    elapsed = time.monotonic() - start
+    
+    rate = len(unique_domains) / elapsed if elapsed > 0 else 0.0
+    print(f"Probed {len(unique_domains)} URLs in {elapsed:.1f}s ({rate:.2f} URLs/sec)")
+    requests_sent, connections = HTTP_CLIENT.pool_stats()
+    requests_sent -= requests_before
+    connections -= connections_before
+    print(f"HTTP pool: {requests_sent} requests over {connections} new connections "
+          f"({max(0, requests_sent - connections)} reused), {HTTP_CLIENT.retries - retries_before} retries, "
+          f"{HTTP_CLIENT.rejected - rejected_before} skipped by open circuits")
+    return {result['domain']: result for result in results}
+
+class ResultStore:
+    """
+    The last check result per URL, kept in SQLite between runs.
+    verified_at is when the verdict was last worked out from the page itself;
+    checked_at moves on every run, including runs that reused the stored verdict.
+    """
+    def __init__(self, path=RESULT_STORE_PATH):
+        # Worker processes share this file, so wait for their locks rather than failing
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER,
+                final_url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                body_hash TEXT,
+                verdict TEXT,
+                checked_at REAL,
+                verified_at REAL
+            )
+        """)
+        self.conn.commit()
+    
+    def get(self, url):
+        row = self.conn.execute("SELECT * FROM results WHERE url = ?", (url,)).fetchone()
+        return dict(row) if row else None
+    
+    def save(self, url, probe, verdict, status_code, reused=False):
+        response = probe['response']
+        now = time.time()
+        previous = self.get(url)
+        
+        if previous and response is not None and response.status_code == 304:
+            self.conn.execute("UPDATE results SET checked_at = ? WHERE url = ?", (now, url))
+            return
+        
+        headers = response.headers if response is not None else {}
+        verified_at = previous['verified_at'] if reused and previous else now
+        self.conn.execute("""
+            INSERT OR REPLACE INTO results
+                (url, status_code, final_url, etag, last_modified, body_hash, verdict, checked_at, verified_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (url, status_code, response.url if response is not None else None, headers.get('ETag'),
+              headers.get('Last-Modified'), probe.get('body_hash'), verdict, now, verified_at))
+    
+    def commit(self):
+        self.conn.commit()
+    
+    def close(self):
+        self.conn.close()
+
+class WorkQueue:
+    """
+    A durable queue of URLs to check, shared through SQLite by the coordinator and its workers.
+    Workers lease URLs in batches and renew the lease while they work. If a worker dies, its
+    leases run out and the URLs are handed to another worker; a URL that has been leased
+    WORK_MAX_ATTEMPTS times without finishing is given up as an unexpected error.
+    """
+    def __init__(self, path=WORK_QUEUE_PATH, lease_seconds=WORK_LEASE_SECONDS, max_attempts=WORK_MAX_ATTEMPTS):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                created_at REAL,
+                open INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                run_id TEXT,
+                url TEXT,
+                state TEXT,
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER DEFAULT 0,
+                verdict TEXT,
+                status_code INTEGER,
+                latency REAL,
+                PRIMARY KEY (run_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS worker_stats (
+                run_id TEXT,
+                worker TEXT,
+                stats TEXT,
+                histograms TEXT,
+                PRIMARY KEY (run_id, worker)
+            );
+        """)
+    
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+    
+    def start_run(self, run_id, urls):
+        """Queue a run's URLs, dropping any run a previous coordinator left open."""
+        with self.transaction():
+            stale = [row['run_id'] for row in self.conn.execute("SELECT run_id FROM runs WHERE open = 1")]
+            for stale_id in stale:
+                print(f"Dropping unfinished run {stale_id} from the work queue")
+                self._delete_run(stale_id)
+            self.conn.execute("INSERT INTO runs (run_id, created_at, open) VALUES (?, ?, 1)", (run_id, time.time()))
+            self.conn.executemany("INSERT INTO jobs (run_id, url, state) VALUES (?, ?, 'pending')",
+                                  [(run_id, url) for url in urls])
+    
+    def lease(self, worker, limit):
+        """Lease up to limit URLs from the oldest open run. Returns (run_id, urls), or (None, []) if there is no work."""
+        now = time.time()
+        with self.transaction():
+            # Give up on URLs whose last allowed lease expired or was released by a crashed worker
+            self.conn.execute("""
+                UPDATE jobs SET state = 'done', verdict = 'unexpected_error', status_code = NULL, latency = 0
+                WHERE attempts >= ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+            """, (self.max_attempts, now))
+            rows = self.conn.execute("""
+                SELECT jobs.run_id, jobs.url FROM jobs JOIN runs ON runs.run_id = jobs.run_id
+                WHERE runs.open = 1 AND (jobs.state = 'pending' OR (jobs.state = 'leased' AND jobs.lease_expires < ?))
+                ORDER BY runs.created_at LIMIT ?
+            """, (now, limit)).fetchall()
+            if not rows:
+                return None, []
+            run_id = rows[0]['run_id']
+            urls = [row['url'] for row in rows if row['run_id'] == run_id]
+            self.conn.executemany("""
+                UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE run_id = ? AND url = ?
+            """, [(worker, now + self.lease_seconds, run_id, url) for url in urls])
+        return run_id, urls
+    
+    def renew(self, worker):
+        self.conn.execute("UPDATE jobs SET lease_expires = ? WHERE worker = ? AND state = 'leased'",
+                          (time.time() + self.lease_seconds, worker))
+    
+    def release_worker(self, worker):
+        """Put a dead worker's leased URLs straight back on the queue. Returns how many were released."""
+        cursor = self.conn.execute("UPDATE jobs SET state = 'pending', worker = NULL WHERE worker = ? AND state = 'leased'",
+                                   (worker,))
+        return cursor.rowcount
+    
+    def complete(self, run_id, worker, verdicts, latencies, stats, histograms):
+        with self.transaction():
+            self.conn.executemany("""
+                UPDATE jobs SET state = 'done', verdict = ?, status_code = ?, latency = ?
+                WHERE run_id = ? AND url = ? AND state = 'leased'
+            """, [(verdict, status_code, latencies.get(url, 0.0), run_id, url)
+                  for url, (verdict, status_code) in verdicts.items()])
+            self.conn.execute("INSERT OR REPLACE INTO worker_stats (run_id, worker, stats, histograms) VALUES (?, ?, ?, ?)",
+                              (run_id, worker, json.dumps(stats), json.dumps(histograms)))
+    
+    def progress(self, run_id):
+        """Return {state: count} for a run's URLs."""
+        rows = self.conn.execute("SELECT state, COUNT(*) AS n FROM jobs WHERE run_id = ? GROUP BY state", (run_id,))
+        return Counter({row['state']: row['n'] for row in rows})
+    
+    def has_open_runs(self):
+        return self.conn.execute("SELECT 1 FROM runs WHERE open = 1 LIMIT 1").fetchone() is not None
+    
+    def results(self, run_id):
+        """
+        Return ({url: (verdict, status_code)}, {url: latency}, merged worker stats,
+        [stage histograms from each worker]) for a run.
+        """
+        verdicts = {}
+        latencies = {}
+        for row in self.conn.execute("SELECT url, verdict, status_code, latency FROM jobs WHERE run_id = ? AND state = 'done'", (run_id,)):
+            verdicts[row['url']] = (row['verdict'], row['status_code'])
+            latencies[row['url']] = row['latency'] or 0.0
+        stats = Counter()
+        histograms = []
+        for row in self.conn.execute("SELECT stats, histograms FROM worker_stats WHERE run_id = ?", (run_id,)):
+            stats.update(json.loads(row['stats']))
+            histograms.append(json.loads(row['histograms'] or '{}'))
+        return verdicts, latencies, stats, histograms
+    
+    def give_up(self, run_id):
+        """Settle every unfinished URL of a run as an unexpected error. Returns how many were given up."""
+        cursor = self.conn.execute("""
+            UPDATE jobs SET state = 'done', verdict = 'unexpected_error', status_code = NULL, latency = 0
+            WHERE run_id = ? AND state != 'done'
+        """, (run_id,))
+        return cursor.rowcount
+    
+    def finish_run(self, run_id):
+        with self.transaction():
+            self._delete_run(run_id)
+    
+    def _delete_run(self, run_id):
+        self.conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+        self.conn.execute("DELETE FROM worker_stats WHERE run_id = ?", (run_id,))
+        self.conn.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+    
+    def close(self):
+        self.conn.close()
+
+def is_reusable(previous):
+    """Return whether a stored result can stand in for a fresh classification of an unchanged page."""
+    return bool(
+        previous
+        and previous['status_code'] == 200
+        and previous['verdict'] in ('healthy', 'expired', 'special_error')
+        and time.time() - (previous['verified_at'] or 0) < REVALIDATE_MAX_AGE_HOURS * 3600
+    )
+
+def get_conditional_headers(previous, reusable):
+    if not reusable:
+        return None
+    headers = {}
+    if previous['etag']:
+        headers['If-None-Match'] = previous['etag']
+    if previous['last_modified']:
+        headers['If-Modified-Since'] = previous['last_modified']
+    return headers or None
+
+def reuse_previous_verdict(domain, probe, previous, reusable, stats):
+    """
+    Return the stored (verdict, status_code) if the page hasn't changed since it was last classified, else None.
+    reusable is the is_reusable() decision taken before the probe, when the conditional headers were chosen;
+    re-checking the age afterwards would reject the 304 answer to our own If-None-Match.
+    """
+    response = probe['response']
+    if response is None or not reusable:
+        return None
+    
+    if response.status_code == 304:
+        stats['not_modified'] += 1
+        print(f"{domain} not modified since last check - reusing verdict: {previous['verdict']}")
+        return previous['verdict'], previous['status_code']
+    if response.status_code == 200 and probe['body_hash'] == previous['body_hash']:
+        stats['unchanged_body'] += 1
+        print(f"{domain} body unchanged since last check - reusing verdict: {previous['verdict']}")
+        return previous['verdict'], previous['status_code']
+    return None
+
+def find_special_error(hits):
+    """Return a description of an Error 1000 or NXDOMAIN marker among the raw response hits, if any."""
+    cloudflare = hits.get('cloudflare_patterns', set())
+    if 'error_1000_patterns' in hits:
+        return "Error 1000"
+    elif "dns points to prohibited ip" in cloudflare and "cloudflare" in cloudflare:
+        return "Cloudflare Error 1000 indicators"
+    elif "dns_probe_finished_nxdomain" in hits.get('nxdomain_patterns', set()):
+        return "DNS_PROBE_FINISHED_NXDOMAIN"
+    return None
+
+def find_rendered_special_error(snapshot):
+    """Return a description of an error that is only visible in the rendered page snapshot, if any."""
+    hits = snapshot['page_hits']
+    cloudflare = hits.get('cloudflare_patterns', set())
+    
+    # Check for Error 1000
+    if 'error_1000_patterns' in hits:
+        return "Error 1000"
+    # Check for Cloudflare error patterns
+    elif {"ray id:", "cloudflare", "dns points to"} <= cloudflare:
+        return "Cloudflare Error 1000 indicators"
+    # Check for DNS_PROBE_FINISHED_NXDOMAIN
+    elif "dns_probe_finished_nxdomain" in hits.get('nxdomain_patterns', set()):
+        return "DNS_PROBE_FINISHED_NXDOMAIN"
+    return None
+
+def is_dns_error(error):
+    # Check for DNS-related errors in the exception text
+    error_str = str(error).lower()
+    return any(phrase in error_str for phrase in [
+        "name or service not known", 
+        "nodename nor servname provided",
+        "cannot resolve",
+        "name resolution",
+        "getaddrinfo failed",
+        "dns",
+        "nxdomain"
+    ])
+
+def confirm_nxdomain(driver, domain):
+    """Load a URL that failed DNS resolution and return whether Chrome also shows NXDOMAIN."""
+    driver.get(domain)
+    WebDriverWait(driver, 5).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    return 'nxdomain_patterns' in PAGE_MATCHER.scan(driver.page_source)
+
+async def classify_request_error(domain, error, pool):
+    """Classify a URL whose HTTP request raised instead of returning a response."""
+    if not isinstance(error, requests.exceptions.RequestException):
+        return 'unexpected_error', None
+    
+    if isinstance(error, CircuitOpenError) or not is_dns_error(error):
+        return 'connection_error', None
+    
+    print(f"DNS resolution error for {domain} - not reporting to Slack")
+    
+    # Try with Selenium as a fallback to confirm it's DNS_PROBE_FINISHED_NXDOMAIN
     try:
-        print("Setting up Selenium...")
-        driver = setup_selenium()
+        if await pool.render(confirm_nxdomain, domain):
+            print(f"Confirmed DNS_PROBE_FINISHED_NXDOMAIN with Selenium for {domain}")
+        else:
+            # If Selenium can access it but requests couldn't, it might be a different issue
+            # In this case, we should report it
+            return 'connection_error', None
+    except Exception:
+        # If Selenium also fails, it's most likely a DNS issue, so don't report
+        pass
+    return 'dns_error', None
+
+async def check_domain(domain, probe, pool, stats):
+    """
+    Classify a probed URL, escalating to the render pool when the raw response is not conclusive.
+    Returns a (verdict, status_code) tuple.
+    """
+    response = probe['response']
+    if response is None:
+        return await classify_request_error(domain, probe['error'], pool)
+    
+    print(f"{domain}: Response status code: {response.status_code}")
+    print(f"{domain}: Final URL after redirects: {response.url}")
+    
+    # The body was scanned while it streamed in; the special-error and static checks share the hits
+    body = probe['body']
+    hits = probe['hits']
+    stats['bytes_read'] += probe['bytes_read']
+    if probe['stopped_early']:
+        stats['stopped_early'] += 1
+    if probe['truncated']:
+        stats['truncated'] += 1
+    print(f"{domain}: Read {probe['bytes_read']} bytes"
+          f"{' (stopped early on a decisive marker)' if probe['stopped_early'] else ''}"
+          f"{' (truncated at MAX_BODY_BYTES)' if probe['truncated'] else ''}")
+    
+    # Check for Error 1000 or DNS_PROBE_FINISHED_NXDOMAIN in the content
+    special_error = find_special_error(hits)
+    if special_error:
+        print(f"Found {special_error} in response content for {domain}")
+    
+    # Settle what we can from the static HTML and only render ambiguous pages.
+    # The special-error and expiration checks both read the same rendered snapshot.
+    snapshot = None
+    render_failed = False
+    if not special_error and response.status_code == 200:
+        with TIMINGS.span('static_analysis', domain):
+            static_verdict, static_reason = analyze_static_content(body, response.url, hits)
+        if static_verdict:
+            stats['static_verdicts'] += 1
+            print(f"Static analysis for {domain}: {static_verdict} ({static_reason})")
+            return static_verdict, response.status_code
+        
+        # Known parked/expired templates get their verdict without a browser
+        with TIMINGS.span('fingerprint', domain):
+            fingerprint = html_skeleton_fingerprint(body)
+        if fingerprint:
+            cached_verdict = FINGERPRINT_CACHE.get(fingerprint)
+            if cached_verdict:
+                stats['fingerprint_hits'] += 1
+                print(f"Known page template for {domain}: {cached_verdict} - skipping render")
+                return cached_verdict, response.status_code
+            stats['fingerprint_misses'] += 1
         
-        print("Attempting to connect to Google Sheet...")
+        stats['escalated'] += 1
+        print(f"Static analysis inconclusive for {domain} ({static_reason}) - rendering")
         try:
-            spreadsheet = creds.open_by_key(SHEET_URL)
-            sheet = next((ws for ws in spreadsheet.worksheets() if ws.id == 0), None)
-            if not sheet:
-                raise Exception("Could not find worksheet")
+            with TIMINGS.span('render', domain):
+                snapshot = await pool.render(capture_page_snapshot, domain)
+            stats['renders'] += 1
+            stats['render_wait_seconds'] += snapshot['wait_seconds']
+            stats['render_wait_saved'] += snapshot['legacy_wait_seconds'] - snapshot['wait_seconds']
+            print(f"{domain}: Page ready ({snapshot['ready_reason']}) after {snapshot['wait_seconds']:.1f}s of waits "
+                  f"vs {snapshot['legacy_wait_seconds']:.0f}s with fixed sleeps")
+            special_error = find_rendered_special_error(snapshot)
+            if special_error:
+                print(f"Found {special_error} in rendered content for {domain}")
+        except Exception as e:
+            print(f"Error rendering {domain} with Selenium: {e}")
+            render_failed = True
+    
+    if special_error:
+        print(f"Error 1000 or DNS_PROBE_FINISHED_NXDOMAIN for {domain} - not reporting to Slack")
+        verdict = 'special_error'
+    elif render_failed:
+        # Without the rendered page we can't tell whether it's expired; don't guess healthy
+        verdict = 'render_failed'
+    elif response.status_code == 200:
+        with TIMINGS.span('expiration_check', domain):
+            is_expired, reason = analyze_domain_status(body, domain, response.url, None, snapshot)
+        verdict = 'expired' if is_expired else 'healthy'
+    elif response.status_code == 403:
+        verdict = 'forbidden'
+    elif response.status_code != 404:  # Only exclude 404s from reporting
+        verdict = 'http_error'
+    else:
+        verdict = 'not_found'
+    
+    if snapshot is not None and fingerprint:
+        # Teach the template cache what this skeleton rendered to
+        FINGERPRINT_CACHE.record(fingerprint, domain, verdict)
+    return verdict, response.status_code
+
+# Verdicts that format_failure_message() reports to Slack
+REPORTED_VERDICTS = ('expired', 'forbidden', 'http_error', 'connection_error', 'unexpected_error')
+
+def format_failure_message(verdict, domain, account_name, status_code=None):
+    """Return the Slack line for a verdict, or None if the verdict is not reported."""
+    if verdict == 'expired':
+        return f"🚫 Domain expired: {domain} / {account_name}"
+    elif verdict == 'forbidden':
+        return f"🔒 Access Forbidden (403): {domain} / {account_name}"
+    elif verdict == 'http_error':
+        return f"⚠️ HTTP {status_code}: {domain} / {account_name}"
+    elif verdict == 'connection_error':
+        return f"❌ Connection Error: {domain} / {account_name}"
+    elif verdict == 'unexpected_error':
+        return f"❌ Unexpected Error: {domain} / {account_name}"
+    return None
+
+def format_state_changes(rows, verdicts, previous_results):
+    """Return Slack lines for rows whose reported state differs from the stored result."""
+    changes = []
+    for account_name, domain, target in rows:
+        verdict, status_code = verdicts[target]
+        if verdict == 'render_failed':
+            continue
+        message = format_failure_message(verdict, domain, account_name, status_code)
+        previous = previous_results.get(target)
+        previous_message = format_failure_message(previous['verdict'], domain, account_name, previous['status_code']) if previous else None
+        if message and message != previous_message:
+            changes.append(message)
+        elif not message and previous_message:
+            changes.append(f"✅ Recovered: {domain} / {account_name}")
+    return changes
+
+def print_run_summary(stats):
+    if stats['targets']:
+        print(f"Dedup: {stats['rows']} rows -> {stats['targets']} unique URLs "
+              f"(dedup ratio {stats['rows'] / stats['targets']:.2f}x, {stats['rows'] - stats['targets']} duplicate checks skipped)")
+    if stats['dns_nxdomain']:
+        print(f"DNS stage: {stats['dns_nxdomain']} URLs classified as NXDOMAIN without HTTP or browser work")
+    if stats['not_modified'] or stats['unchanged_body']:
+        print(f"Revalidation: {stats['not_modified']} not modified (304), "
+              f"{stats['unchanged_body']} unchanged bodies - stored verdicts reused")
+    print(f"Response bodies: {stats['bytes_read']} bytes read, {stats['stopped_early']} stopped early, "
+          f"{stats['truncated']} truncated at {MAX_BODY_BYTES} bytes")
+    static_checked = stats['static_verdicts'] + stats['fingerprint_hits'] + stats['escalated']
+    if static_checked:
+        escalation_rate = stats['escalated'] / static_checked * 100
+        print(f"Static tier: {stats['static_verdicts'] + stats['fingerprint_hits']}/{static_checked} pages classified without Chrome "
+              f"({stats['escalated']} escalated, escalation rate {escalation_rate:.1f}%)")
+    if stats['renders']:
+        print(f"Readiness waits: {stats['render_wait_seconds'] / stats['renders']:.1f}s per render, "
+              f"{stats['render_wait_saved']:.1f}s saved vs fixed sleeps "
+              f"({stats['render_wait_saved'] / stats['renders']:.1f}s per URL)")
+    if stats['fingerprint_hits'] or stats['fingerprint_misses']:
+        print(f"Fingerprint cache: {stats['fingerprint_hits']} hits, {stats['fingerprint_misses']} misses this run "
+              f"({FINGERPRINT_CACHE.hits} hits, {FINGERPRINT_CACHE.misses} misses, "
+              f"{len(FINGERPRINT_CACHE.entries)} templates since startup)")
+
+async def check_domain_safely(domain, probe, pool, stats):
+    try:
+        return await check_domain(domain, probe, pool, stats)
+    except Exception as e:
+        print(f"Error checking {domain}: {e}")
+        return 'unexpected_error', None
+
+def normalize_url(url):
+    """
+    Reduce a URL to the key used to deduplicate checks.
+    Scheme, host case, default ports, trailing slashes and fragments don't make a URL a different target.
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').rstrip('.')
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    netloc = host if port in (None, 80, 443) else f"{host}:{port}"
+    path = parsed.path.rstrip('/')
+    return netloc + path + ('?' + parsed.query if parsed.query else '')
+
+def dedupe_rows(domain_data):
+    """
+    Assign every (account, url) row the target URL that will actually be checked.
+    Rows whose URLs normalize to the same key share one target, preferring the https form.
+    Returns (rows, targets) where rows are (account, url, target) tuples.
+    """
+    targets_by_key = {}
+    for _, domain in domain_data:
+        key = normalize_url(domain)
+        current = targets_by_key.get(key)
+        if current is None or (domain.startswith('https://') and not current.startswith('https://')):
+            targets_by_key[key] = domain
+    
+    rows = [(account, domain, targets_by_key[normalize_url(domain)]) for account, domain in domain_data]
+    return rows, list(targets_by_key.values())
+
+def load_domain_rows():
+    """Read (account name, URL) pairs from the sheet."""
+    print("Attempting to connect to Google Sheet...")
+    spreadsheet = get_sheets_client().open_by_key(SHEET_URL)
+    sheet = next((ws for ws in spreadsheet.worksheets() if ws.id == 0), None)
+    if not sheet:
+        raise Exception("Could not find worksheet")
+    
+    all_values = sheet.get_all_values()
+    # Get both Ad Account Name and domain, skip header row
+    domain_data = [(row[0].strip(), row[2].strip()) for row in all_values[1:] if len(row) > 2 and row[2].strip()]
+    # Add http:// if needed and keep the account name
+    return [(account, 'http://' + domain if not domain.startswith(('http://', 'https://')) else domain) 
+            for account, domain in domain_data]
+
+async def check_targets(targets, pool, store, stats):
+    """
+    Run the DNS, HTTP, static and render stages over unique target URLs and record the results.
+    Returns ({target: (verdict, status_code)}, {target: previous stored result or None},
+    {target: seconds spent fetching and classifying it}).
+    """
+    previous_results = {target: store.get(target) for target in targets}
+    # Decided once: the same answer picks the conditional headers and accepts the 304
+    reusable = {target: is_reusable(previous_results[target]) for target in targets}
+    
+    # Resolve every host first; names that don't exist need no HTTP or browser work
+    hosts = {target: urlparse(target).hostname for target in targets}
+    with TIMINGS.span('dns', hosts=len(set(hosts.values()))):
+        dns_results = await HOST_RESOLVER.resolve_all(hosts.values())
+    unresolvable = {target for target in targets if dns_results.get(hosts[target]) == 'nxdomain'}
+    for target in unresolvable:
+        print(f"DNS resolution error for {target} - not reporting to Slack")
+    
+    # Fetch every URL up front so slow hosts don't hold up the rest of the sheet.
+    # URLs with a stored verdict are fetched conditionally.
+    to_probe = [target for target in targets if target not in unresolvable]
+    print(f"Probing {len(to_probe)} URLs...")
+    probes = await probe_urls(to_probe, {
+        target: get_conditional_headers(previous_results[target], reusable[target]) for target in to_probe
+    })
+    probes.update({target: empty_probe(target) for target in unresolvable})
+    
+    stats['dns_nxdomain'] += len(unresolvable)
+    reused = {target: reuse_previous_verdict(target, probes[target], previous_results[target], reusable[target], stats)
+              for target in to_probe}
+    
+    # Classify the rest concurrently; render jobs queue up on the driver pool
+    latencies = {target: probes[target]['elapsed'] for target in targets}
+    
+    async def classify(target):
+        start = time.monotonic()
+        result = await check_domain_safely(target, probes[target], pool, stats)
+        latencies[target] += time.monotonic() - start
+        return result
+    
+    to_check = [target for target in to_probe if not reused[target]]
+    results = await asyncio.gather(*(classify(target) for target in to_check))
+    verdicts = dict(zip(to_check, results))
+    verdicts.update({target: verdict for target, verdict in reused.items() if verdict})
+    verdicts.update({target: ('dns_error', None) for target in unresolvable})
+    
+    for target in targets:
+        # A failed render settles nothing, so the last real result stays in the store
+        if verdicts[target][0] != 'render_failed':
+            store.save(target, probes[target], *verdicts[target], reused=bool(reused.get(target)))
+    store.commit()
+    return verdicts, previous_results, latencies
+
+def worker_id(pid=None):
+    return f"{socket.gethostname()}-{pid or os.getpid()}"
+
+def spawn_worker():
+    """Start a local worker process that exits once the queue has no open runs."""
+    env = dict(os.environ, RUN_MODE='worker', WORKER_EXIT_WHEN_IDLE='true')
+    return subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker'], env=env)
+
+async def coordinate_targets(targets, store, stats, memory_samples):
+    """
+    Queue the target URLs for worker processes and wait for every verdict.
+    Local workers that die have their leases released at once and are restarted with backoff;
+    the leases of workers in other containers run out on their own. If the local workers use up
+    their restarts or the run passes WORK_RUN_DEADLINE, the unfinished URLs are given up as
+    unexpected errors so they get reported. The coordinator's process tree, local workers
+    included, is sampled into memory_samples. Same return value as check_targets().
+    """
+    previous_results = {target: store.get(target) for target in targets}
+    run_id = TIMINGS.run_id
+    work_queue = WorkQueue()
+    work_queue.start_run(run_id, targets)
+    print(f"Queued {len(targets)} URLs for run {run_id}, starting {WORKER_PROCESSES} local workers...")
+    workers = [spawn_worker() for _ in range(WORKER_PROCESSES)]
+    started_at = [time.monotonic()] * len(workers)
+    restart_at = [None] * len(workers)
+    failures = [0] * len(workers)
+    respawns = 0
+    deadline = time.monotonic() + WORK_RUN_DEADLINE if WORK_RUN_DEADLINE else None
+    last_report = time.monotonic()
+    try:
+        while True:
+            progress = work_queue.progress(run_id)
+            if progress['done'] == len(targets):
+                break
+            
+            now = time.monotonic()
+            for i, process in enumerate(workers):
+                if process is not None and process.poll() is not None:
+                    released = work_queue.release_worker(worker_id(process.pid))
+                    # A worker that dies soon after starting will most likely do so again
+                    failures[i] = failures[i] + 1 if now - started_at[i] < WORKER_RESPAWN_MAX_DELAY else 1
+                    workers[i] = None
+                    if respawns >= WORKER_MAX_RESPAWNS:
+                        print(f"Worker {process.pid} exited with code {process.returncode}; re-queued {released} URLs, "
+                              f"not restarting it after {respawns} restarts this run")
+                        continue
+                    delay = min(WORK_POLL_INTERVAL * 2 ** (failures[i] - 1), WORKER_RESPAWN_MAX_DELAY)
+                    restart_at[i] = now + delay
+                    print(f"Worker {process.pid} exited with code {process.returncode}; "
+                          f"re-queued {released} URLs, starting a replacement in {delay:.1f}s")
+                if workers[i] is None and restart_at[i] is not None and now >= restart_at[i]:
+                    workers[i] = spawn_worker()
+                    started_at[i] = now
+                    restart_at[i] = None
+                    respawns += 1
             
-            all_values = sheet.get_all_values()
-            # Get both Ad Account Name and domain, skip header row
-            domain_data = [(row[0].strip(), row[2].strip()) for row in all_values[1:] if len(row) > 2 and row[2].strip()]
-            # Add http:// if needed and keep the account name
-            domain_data = [(account, 'http://' + domain if not domain.startswith(('http://', 'https://')) else domain) 
-                          for account, domain in domain_data]
+            reason = None
+            if workers and all(process is None and restart_at[i] is None for i, process in enumerate(workers)):
+                reason = f"all local workers failed after {respawns} restarts"
+            elif deadline is not None and now > deadline:
+                reason = f"run exceeded WORK_RUN_DEADLINE ({WORK_RUN_DEADLINE}s)"
+            if reason:
+                given_up = work_queue.give_up(run_id)
+                print(f"Run {run_id}: {reason}; giving up {given_up} unfinished URLs as unexpected errors")
+                break
             
-            failing_domains = []
-            checked_count = 0
+            memory_samples.append(process_tree_rss(os.getpid()))
+            if time.monotonic() - last_report >= 30:
+                print(f"Run {run_id}: {progress['done']}/{len(targets)} URLs done, {progress['leased']} in progress")
+                last_report = time.monotonic()
+            await asyncio.sleep(WORK_POLL_INTERVAL)
+        
+        verdicts, latencies, worker_stats, worker_histograms = work_queue.results(run_id)
+    finally:
+        work_queue.finish_run(run_id)
+        work_queue.close()
+        for process in workers:
+            if process is None:
+                continue
+            try:
+                process.wait(timeout=RENDER_JOB_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    
+    stats.update(worker_stats)
+    # Workers don't write METRICS_PATH themselves; their stage timings are exported from here
+    for histograms in worker_histograms:
+        TIMINGS.merge(histograms)
+    return verdicts, previous_results, latencies
+
+async def run_worker():
+    """Check batches of queued URLs until stopped (or, for coordinator-started workers, until the queue is idle)."""
+    me = worker_id()
+    print(f"Worker {me} starting...")
+    work_queue = WorkQueue()
+    pool = DriverPool().start()
+    store = ResultStore()
+    stats_by_run = {}
+    # Stage timings per run, sent back through the queue for the coordinator to export
+    timings_by_run = {}
+    
+    async def keep_leases():
+        while True:
+            await asyncio.sleep(WORK_LEASE_SECONDS / 3)
+            work_queue.renew(me)
+    
+    try:
+        while True:
+            run_id, urls = work_queue.lease(me, WORK_BATCH_SIZE)
+            if not urls:
+                if WORKER_EXIT_WHEN_IDLE and not work_queue.has_open_runs():
+                    break
+                await asyncio.sleep(WORK_POLL_INTERVAL)
+                continue
             
-            for account_name, domain in domain_data:
-                checked_count += 1
-                print(f"\n{'='*50}")
-                print(f"Checking URL {checked_count}/{len(domain_data)}: {domain}")
-                print(f"Ad Account: {account_name}")
-                print(f"{'='*50}")
+            TIMINGS.run_id = run_id
+            stats = stats_by_run.setdefault(run_id, Counter())
+            run_timings = timings_by_run.setdefault(run_id, StageTimings(span_path=None, metrics_path=None))
+            timings_before = TIMINGS.snapshot()
+            heartbeat = asyncio.ensure_future(keep_leases())
+            try:
+                verdicts, _, latencies = await check_targets(urls, pool, store, stats)
+            except Exception as e:
+                print(f"Worker {me}: error checking a batch of {len(urls)} URLs: {e}")
+                work_queue.release_worker(me)
+                await asyncio.sleep(WORK_POLL_INTERVAL)
+                continue
+            finally:
+                heartbeat.cancel()
+            
+            run_timings.merge(TIMINGS.snapshot(), subtract=timings_before)
+            work_queue.complete(run_id, me, verdicts, latencies, stats, run_timings.snapshot())
+    finally:
+        pool.close()
+        store.close()
+        work_queue.close()
+    print(f"Worker {me} finished")
+
+def is_redirected(target, result):
+    """Return whether the stored result for a URL ended up on a different host."""
+    final_url = result and result['final_url']
+    if not final_url:
+        return False
+    return (urlparse(final_url).hostname or '').rstrip('.') != (urlparse(target).hostname or '').rstrip('.')
+
+class CheckScheduler:
+    """
+    Keeps every URL in a heap ordered by when it is next due.
+    URLs failing with a reported verdict, or without a stored result yet, come back after
+    CHECK_INTERVAL_FAILING; URLs that failed or were added
+    within the risk window, or that redirect to another host, after CHECK_INTERVAL_AT_RISK;
+    everything else after CHECK_INTERVAL_STABLE, including URLs settled in a state that is
+    deliberately not reported (404, NXDOMAIN, Error 1000). Removed URLs are dropped lazily from the heap.
+    """
+    def __init__(self):
+        self.heap = []
+        self.due = {}
+        self.first_seen = {}
+        self.last_failed = {}
+    
+    def interval(self, target, result):
+        now = time.time()
+        risk_window = RISK_WINDOW_HOURS * 3600
+        if result is None or result['verdict'] in REPORTED_VERDICTS:
+            return CHECK_INTERVAL_FAILING
+        if (now - self.first_seen.get(target, 0) < risk_window
+                or now - self.last_failed.get(target, 0) < risk_window
+                or is_redirected(target, result)):
+            return CHECK_INTERVAL_AT_RISK
+        return CHECK_INTERVAL_STABLE
+    
+    def _push(self, target, due):
+        self.due[target] = due
+        heapq.heappush(self.heap, (due, target))
+    
+    def sync(self, targets, store):
+        """Add URLs new to the sheet and forget removed ones. Returns (added, removed) counts."""
+        now = time.time()
+        added = 0
+        for target in targets:
+            if target in self.due:
+                continue
+            added += 1
+            previous = store.get(target)
+            if previous is None:
+                self.first_seen[target] = now
+                self._push(target, now)
+                continue
+            if previous['verdict'] in REPORTED_VERDICTS:
+                self.last_failed[target] = previous['checked_at'] or now
+            due = (previous['checked_at'] or 0) + self.interval(target, previous)
+            if due < now:
+                due = now + random.uniform(0, SCHEDULE_STARTUP_SPREAD)
+            self._push(target, due)
+        
+        removed = set(self.due) - set(targets)
+        for target in removed:
+            del self.due[target]
+            self.first_seen.pop(target, None)
+            self.last_failed.pop(target, None)
+        return added, len(removed)
+    
+    def record(self, target, result):
+        """Schedule a URL's next check from the result it just got."""
+        now = time.time()
+        if result is None or result['verdict'] in REPORTED_VERDICTS:
+            self.last_failed[target] = now
+        interval = self.interval(target, result)
+        self._push(target, now + interval * (1 + random.uniform(0, SCHEDULE_JITTER)))
+    
+    def requeue(self, targets):
+        """Put back popped URLs that were never rescheduled because their check failed, to be retried next tick."""
+        due = time.time() + SCHEDULER_TICK
+        for target in targets:
+            if target not in self.due:
+                self._push(target, due)
+    
+    def pop_due(self, limit):
+        """
+        Take up to limit URLs that are due. To keep the load on each host smooth, at most
+        MAX_REQUESTS_PER_HOST URLs per host are taken at a time; the rest wait a tick.
+        """
+        now = time.time()
+        batch = []
+        per_host = Counter()
+        deferred = []
+        while self.heap and self.heap[0][0] <= now and len(batch) < limit:
+            due, target = heapq.heappop(self.heap)
+            if self.due.get(target) != due:
+                continue
+            host = urlparse(target).hostname
+            if per_host[host] >= MAX_REQUESTS_PER_HOST:
+                deferred.append(target)
+                continue
+            per_host[host] += 1
+            del self.due[target]
+            batch.append(target)
+        for target in deferred:
+            self._push(target, now + SCHEDULER_TICK)
+        return batch
+    
+    def seconds_until_due(self):
+        while self.heap and self.due.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - time.time())
+
+async def run_continuous():
+    """
+    Check URLs as they fall due instead of all at once, re-reading the sheet every
+    SHEET_REFRESH_INTERVAL seconds. Only state changes are posted to Slack, and a critical
+    error is posted once until a sheet read or batch succeeds.
+    A failed sheet read is retried at the next refresh; meanwhile the URLs from the last
+    good read keep being checked. A batch that fails is put back on the schedule.
+    Memory use is reported and sampled afresh at every refresh.
+    """
+    scheduler = CheckScheduler()
+    pool = DriverPool().start()
+    store = ResultStore()
+    rows = []
+    stats = Counter()
+    last_refresh = None
+    last_error = None
+    try:
+        while True:
+            batch = []
+            try:
+                if last_refresh is None or time.monotonic() - last_refresh >= SHEET_REFRESH_INTERVAL:
+                    if last_refresh is not None:
+                        print_run_summary(stats)
+                        memory = pool.memory_summary(reset=True)
+                        print(f"Memory: peak {memory['peak_mb']:.0f}MB, steady state {memory['steady_mb']:.0f}MB")
+                        TIMINGS.write_metrics()
+                    last_refresh = time.monotonic()
+                    with TIMINGS.span('sheet_read'):
+                        domain_data = load_domain_rows()
+                    rows, targets = dedupe_rows(domain_data)
+                    added, removed = scheduler.sync(targets, store)
+                    stats = Counter(rows=len(rows), targets=len(targets))
+                    last_error = None
+                    print(f"Sheet refreshed: {len(targets)} URLs scheduled ({added} added, {removed} removed)")
                 
-                try:
-                    response = requests.get(domain, timeout=30, headers={
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                    }, allow_redirects=True)
-                    
-                    print(f"Response status code: {response.status_code}")
-                    print(f"Final URL after redirects: {response.url}")
-                    
-                    # Check for Error 1000 or DNS_PROBE_FINISHED_NXDOMAIN in the content
-                    has_special_error = False
-                    
-                    # First check in the response text
-                    response_text_lower = response.text.lower()
-                    if "error 1000" in response_text_lower:
-                        print(f"Found Error 1000 in response content for {domain}")
-                        has_special_error = True
-                    elif "dns points to prohibited ip" in response_text_lower and "cloudflare" in response_text_lower:
-                        print(f"Found Cloudflare Error 1000 indicators in response content for {domain}")
-                        has_special_error = True
-                    elif "dns_probe_finished_nxdomain" in response_text_lower:
-                        print(f"Found DNS_PROBE_FINISHED_NXDOMAIN in response content for {domain}")
-                        has_special_error = True
+                batch = scheduler.pop_due(SCHEDULER_BATCH_SIZE)
+                if batch:
+                    TIMINGS.start_run()
+                    with TIMINGS.span('batch', urls=len(batch)):
+                        verdicts, previous_results, _ = await check_targets(batch, pool, store, stats)
+                    for target in batch:
+                        scheduler.record(target, store.get(target))
                     
-                    # Use Selenium to check for errors that might only be visible in rendered content
-                    if not has_special_error and response.status_code == 200:
-                        try:
-                            driver.get(domain)
-                            WebDriverWait(driver, 10).until(
-                                EC.presence_of_element_located((By.TAG_NAME, "body"))
-                            )
-                            page_source = driver.page_source.lower()
-                            
-                            # Check for Error 1000
-                            if "error 1000" in page_source:
-                                print(f"Found Error 1000 in rendered content for {domain}")
-                                has_special_error = True
-                            # Check for Cloudflare error patterns
-                            elif "ray id:" in page_source and "cloudflare" in page_source and "dns points to" in page_source:
-                                print(f"Found Cloudflare Error 1000 indicators in rendered content for {domain}")
-                                has_special_error = True
-                            # Check for DNS_PROBE_FINISHED_NXDOMAIN
-                            elif "dns_probe_finished_nxdomain" in page_source:
-                                print(f"Found DNS_PROBE_FINISHED_NXDOMAIN in rendered content for {domain}")
-                                has_special_error = True
-                            # Check for the specific text shown in the screenshot
-                            elif "this site can't be reached" in page_source and "dns_probe_finished_nxdomain" in page_source:
-                                print(f"Found 'This site can't be reached' with DNS_PROBE_FINISHED_NXDOMAIN for {domain}")
-                                has_special_error = True
-                        except Exception as e:
-                            print(f"Error checking for special errors with Selenium: {e}")
-                    
-                    if has_special_error:
-                        print(f"Error 1000 or DNS_PROBE_FINISHED_NXDOMAIN for {domain} - not reporting to Slack")
-                    elif response.status_code == 200:
-                        is_expired, reason = analyze_domain_status(response.text, domain, response.url, None, driver)
-                        if is_expired:
-                            error_msg = f"🚫 Domain expired: {domain} / {account_name}"
-                            failing_domains.append(error_msg)
-                            print(error_msg)
-                        else:
-                            print(f"✓ URL appears healthy: {domain}")
-                    elif response.status_code == 403:
-                        error_msg = f"🔒 Access Forbidden (403): {domain} / {account_name}"
-                        failing_domains.append(error_msg)
-                        print(error_msg)
-                    elif response.status_code != 404:  # Only exclude 404s from reporting
-                        error_msg = f"⚠️ HTTP {response.status_code}: {domain} / {account_name}"
-                        failing_domains.append(error_msg)
-                        print(error_msg)
-                    else:
-                        print(f"404 error for {domain} - not reporting to Slack")
-                    
-                except requests.exceptions.RequestException as e:
-                    # Check for DNS-related errors in the exception text
-                    error_str = str(e).lower()
-                    if any(phrase in error_str for phrase in [
-                        "name or service not known", 
-                        "nodename nor servname provided",
-                        "cannot resolve",
-                        "name resolution",
-                        "getaddrinfo failed",
-                        "dns",
-                        "nxdomain"
-                    ]):
-                        print(f"DNS resolution error for {domain} - not reporting to Slack")
-                        
-                        # Try with Selenium as a fallback to confirm it's DNS_PROBE_FINISHED_NXDOMAIN
-                        try:
-                            driver.get(domain)
-                            WebDriverWait(driver, 5).until(
-                                EC.presence_of_element_located((By.TAG_NAME, "body"))
-                            )
-                            page_source = driver.page_source.lower()
-                            if "dns_probe_finished_nxdomain" in page_source or "this site can't be reached" in page_source:
-                                print(f"Confirmed DNS_PROBE_FINISHED_NXDOMAIN with Selenium for {domain}")
-                            else:
-                                # If Selenium can access it but requests couldn't, it might be a different issue
-                                # In this case, we should report it
-                                error_msg = f"❌ Connection Error: {domain} / {account_name}"
-                                failing_domains.append(error_msg)
-                                print(error_msg)
-                        except Exception:
-                            # If Selenium also fails, it's most likely a DNS issue, so don't report
-                            pass
-                    else:
-                        error_msg = f"❌ Connection Error: {domain} / {account_name}"
-                        failing_domains.append(error_msg)
-                        print(error_msg)
-                except Exception as e:
-                    error_msg = f"❌ Unexpected Error: {domain} / {account_name}"
-                    failing_domains.append(error_msg)
-                    print(error_msg)
+                    batch_targets = set(batch)
+                    changes = format_state_changes([row for row in rows if row[2] in batch_targets], verdicts, previous_results)
+                    if changes:
+                        print("\nSending notifications for changed domains...")
+                        send_slack_message("🔍 Link Check Changes:\n" + "\n".join(changes))
+                    last_error = None
+                    continue
+            except Exception as e:
+                scheduler.requeue(batch)
+                error_msg = f"⚠️ Critical error: {str(e)}"
+                print(error_msg)
+                if error_msg != last_error:
+                    send_slack_message(error_msg)
+                last_error = error_msg
             
-            if failing_domains:
-                print("\nSending notifications for failing domains...")
-                message = "🔍 Link Check Results:\n" + "\n".join(failing_domains)
-                send_slack_message(message)
+            wait = scheduler.seconds_until_due()
+            await asyncio.sleep(SCHEDULER_TICK if wait is None else min(wait, SCHEDULER_TICK))
+    finally:
+        pool.close()
+        store.close()
+
+def report_results(rows, verdicts, previous_results):
+    """Log the verdict for every sheet row and post the Slack report."""
+    failing_domains = []
+    checked_count = 0
+    
+    for account_name, domain, target in rows:
+        checked_count += 1
+        print(f"\n{'='*50}")
+        print(f"Checked URL {checked_count}/{len(rows)}: {domain}")
+        print(f"Ad Account: {account_name}")
+        print(f"{'='*50}")
+        
+        verdict, status_code = verdicts[target]
+        error_msg = format_failure_message(verdict, domain, account_name, status_code)
+        if error_msg:
+            failing_domains.append(error_msg)
+            print(error_msg)
+        elif verdict == 'healthy':
+            print(f"✓ URL appears healthy: {domain}")
+        elif verdict == 'not_found':
+            print(f"404 error for {domain} - not reporting to Slack")
+        elif verdict == 'render_failed':
+            print(f"Could not render {domain} - status unknown, not reporting to Slack")
+    
+    if SLACK_CHANGES_ONLY:
+        changes = format_state_changes(rows, verdicts, previous_results)
+        if changes:
+            print("\nSending notifications for changed domains...")
+            send_slack_message("🔍 Link Check Changes:\n" + "\n".join(changes))
+        else:
+            print("\nNo changes since the last check")
+            send_slack_message("✅ No link status changes since the last check")
+    elif failing_domains:
+        print("\nSending notifications for failing domains...")
+        message = "🔍 Link Check Results:\n" + "\n".join(failing_domains)
+        send_slack_message(message)
+    else:
+        print("\nAll URLs are healthy")
+        send_slack_message("✅ All URLs are functioning correctly")
+
+async def check_links():
+    """Check every URL in the sheet once and report to Slack. Returns a run summary dict, or None on failure."""
+    summary = None
+    try:
+        run_start = time.monotonic()
+        # In coordinator mode the workers own the browsers
+        pool = DriverPool().start() if RUN_MODE != 'coordinator' else None
+        memory_samples = []
+        store = ResultStore()
+        
+        TIMINGS.start_run()
+        try:
+            with TIMINGS.span('sheet_read'):
+                domain_data = load_domain_rows()
+            
+            # Check each distinct URL once and fan the verdict out to every row that uses it
+            rows, targets = dedupe_rows(domain_data)
+            stats = Counter()
+            stats['rows'] = len(rows)
+            stats['targets'] = len(targets)
+            
+            if RUN_MODE == 'coordinator':
+                verdicts, previous_results, latencies = await coordinate_targets(targets, store, stats, memory_samples)
             else:
-                print("\nAll URLs are healthy")
-                send_slack_message("✅ All URLs are functioning correctly")
+                verdicts, previous_results, latencies = await check_targets(targets, pool, store, stats)
+            report_results(rows, verdicts, previous_results)
+            
+            wall_time = time.monotonic() - run_start
+            print_run_summary(stats)
+            print(f"\nRun completed: {len(rows)} rows, {len(targets)} URLs checked in {wall_time:.1f}s")
+            summary = {
+                'rows': len(rows),
+                'targets': len(targets),
+                'wall_time': wall_time,
+                'verdicts': verdicts,
+                'latencies': latencies,
+                'stats': stats,
+            }
                 
         finally:
-            print("Closing Selenium browser...")
-            driver.quit()
+            if pool is not None:
+                print("Closing Selenium render pool...")
+                pool.close()
+            store.close()
+            TIMINGS.record('run', time.monotonic() - run_start)
+            TIMINGS.write_metrics()
+        
+        # Pages Chrome actually loaded and classified; failed and timed-out render jobs don't count
+        summary['renders'] = stats['renders']
+        if pool is not None:
+            summary['memory'] = pool.memory_summary()
+        else:
+            summary['memory'] = summarize_memory(memory_samples + [process_tree_rss(os.getpid())])
                 
     except Exception as e:
         error_msg = f"⚠️ Critical error: {str(e)}"
         print(error_msg)
         send_slack_message(error_msg)
+    return summary
 
 async def wait_until_next_run():
     est = pytz.timezone('US/Eastern')
@@ -423,6 +2506,11 @@ async def main():
     await asyncio.sleep(startup_delay)
     
     print("Service started successfully!")
+    
+    if SCHEDULER_MODE == 'continuous':
+        send_slack_message("🚀 Link checker service started - Checking URLs continuously as they fall due")
+        await run_continuous()
+        return
     send_slack_message("🚀 Link checker service started - Running initial check...")
     
     # Run an immediate check for testing
@@ -444,12 +2532,17 @@ if __name__ == "__main__":
         import pytz
     except ImportError:
         print("Installing required package: pytz")
-        import subprocess
         subprocess.check_call(["pip", "install", "pytz"])
         import pytz
     
-    # Add startup delay to ensure proper deployment
-    print("Service initializing...")
-    time.sleep(30)  # Wait 30 seconds for deployment to stabilize
+    if len(sys.argv) > 1:
+        RUN_MODE = sys.argv[1]
     
-    asyncio.run(main())
\ No newline at end of file
+    if RUN_MODE == 'worker':
+        asyncio.run(run_worker())
+    else:
+        # Add startup delay to ensure proper deployment
+        print("Service initializing...")
+        time.sleep(30)  # Wait 30 seconds for deployment to stabilize
+        
+        asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,56 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'linkchecker PUBLIC.py')
+
+def load_linkchecker():
+    spec = importlib.util.spec_from_file_location('linkchecker', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+lc = load_linkchecker()
+
+class WorkQueueCrashTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.queue = lc.WorkQueue(os.path.join(self.workdir.name, 'queue.db'), lease_seconds=60, max_attempts=3)
+        self.queue.start_run('run-1', ['http://crashes-chrome.example/'])
+
+    def tearDown(self):
+        self.queue.close()
+        self.workdir.cleanup()
+
+    def test_released_job_is_given_up_after_max_attempts(self):
+        # Every worker that leases the URL crashes and the coordinator releases its lease
+        for attempt in range(3):
+            run_id, urls = self.queue.lease(f'worker-{attempt}', 10)
+            self.assertEqual(urls, ['http://crashes-chrome.example/'])
+            self.assertEqual(self.queue.release_worker(f'worker-{attempt}'), 1)
+
+        run_id, urls = self.queue.lease('worker-3', 10)
+        self.assertEqual(urls, [])
+        self.assertEqual(self.queue.progress('run-1')['done'], 1)
+        verdicts = self.queue.results('run-1')[0]
+        self.assertEqual(verdicts, {'http://crashes-chrome.example/': ('unexpected_error', None)})
+
+    def test_released_job_is_retried_before_max_attempts(self):
+        self.queue.lease('worker-0', 10)
+        self.queue.release_worker('worker-0')
+
+        run_id, urls = self.queue.lease('worker-1', 10)
+        self.assertEqual((run_id, urls), ('run-1', ['http://crashes-chrome.example/']))
+
+    def test_given_up_run_reports_unfinished_jobs(self):
+        # The coordinator gives up when its workers can't be kept alive or the run deadline passes
+        self.queue.lease('worker-0', 10)
+        self.assertEqual(self.queue.give_up('run-1'), 1)
+
+        self.assertEqual(self.queue.progress('run-1')['done'], 1)
+        verdicts = self.queue.results('run-1')[0]
+        self.assertEqual(verdicts, {'http://crashes-chrome.example/': ('unexpected_error', None)})
+
+if __name__ == '__main__':
+    unittest.main()